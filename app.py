@@ -1,33 +1,21 @@
 import streamlit as st
 import pandas as pd
 import pydeck as pdk
-import json
+from demographics.data_access import load_geometry, load_table
+from demographics.selection import STATE_NAMES
 
-# Data: U.S. states with their centroids (latitude and longitude)
+# Data: U.S. states with their centroids (latitude and longitude), derived
+# from the state boundaries
+geometry = load_geometry()
+state_names = STATE_NAMES
 state_data = {
-    'State': ['Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado', 'Connecticut', 'Delaware', 'Florida', 'Georgia',
-              'Hawaii', 'Idaho', 'Illinois', 'Indiana', 'Iowa', 'Kansas', 'Kentucky', 'Louisiana', 'Maine', 'Maryland',
-              'Massachusetts', 'Michigan', 'Minnesota', 'Mississippi', 'Missouri', 'Montana', 'Nebraska', 'Nevada', 'New Hampshire', 'New Jersey',
-              'New Mexico', 'New York', 'North Carolina', 'North Dakota', 'Ohio', 'Oklahoma', 'Oregon', 'Pennsylvania', 'Rhode Island', 'South Carolina', 'South Dakota',
-              'Tennessee', 'Texas', 'Utah', 'Vermont', 'Virginia', 'Washington', 'West Virginia', 'Wisconsin', 'Wyoming'],
-    'Latitude': [32.806671, 61.370716, 33.729759, 34.969704, 36.116203, 39.059811, 41.597782, 39.318523, 27.766279, 33.040619,
-                 21.094318, 44.240459, 40.349457, 39.849426, 42.011539, 38.526600, 37.668140, 31.169546, 44.693947, 39.063946,
-                 42.230171, 43.326618, 45.694454, 32.741646, 38.456085, 46.921925, 41.125370, 38.313515, 43.452492, 40.298904,
-                 34.840515, 42.165726, 35.630066, 47.528912, 40.388783, 35.565342, 44.572021, 40.590752, 41.680893, 33.856892, 44.299782,
-                 35.747845, 31.054487, 40.150032, 44.045876, 37.769337, 47.400902, 38.491226, 44.268543, 42.755966],
-    'Longitude': [-86.791130, -152.404419, -111.431221, -92.373123, -119.681564, -105.311104, -72.755371, -75.507141, -81.686783, -83.643074,
-                  -157.498337, -114.478828, -88.986137, -86.258278, -93.210526, -96.726486, -84.670067, -91.867805, -69.381927, -76.802101,
-                  -71.530106, -84.536095, -93.900192, -89.678696, -92.288368, -110.454353, -98.268082, -117.055374, -71.563896, -74.521011,
-                  -106.248482, -74.948051, -79.806419, -99.784012, -82.764915, -96.928917, -122.070938, -77.209755, -71.511780, -80.945007, -99.438828,
-                  -86.692345, -97.563461, -111.862434, -72.710686, -78.169968, -121.490494, -80.954456, -89.616508, -107.302490]
+    'State': state_names,
+    'Latitude': [geometry.centroid(name)[0] for name in state_names],
+    'Longitude': [geometry.centroid(name)[1] for name in state_names]
 }
 # Create a DataFrame from the state data
 df_states = pd.DataFrame(state_data)
 
-# Load state boundaries from a GeoJSON file
-with open("gz_2010_us_040_00_5m.json") as f:
-    geojson_data = json.load(f)
-
 # Streamlit app
 st.title("Select Options to Load Data")
 
@@ -43,12 +31,9 @@ selected_unit_type = st.selectbox("Choose Unit Type:", unit_types)
 selected_category_label = st.selectbox("Choose Data Category:", category_labels.keys())
 selected_category = category_labels[selected_category_label]
 
-# Construct the file path based on user selections
-file_path = f"DM_{selected_category}_{selected_state}_{selected_unit_type}.csv"
-
 try:
-    # Load the selected file into a DataFrame
-    data = pd.read_csv(file_path)
+    # Load the selected table from the columnar store
+    data = load_table(selected_category, selected_state, selected_unit_type)
 
     # Get unique values from the "Structure" column
     unique_structures = data["Structure"].unique()
@@ -71,10 +56,8 @@ try:
     if not state_row.empty:
         coordinates = state_row[['Latitude', 'Longitude']].values[0]
 
-        # Filter the GeoJSON data to include only the selected state
-        selected_state_feature = next(
-            (feature for feature in geojson_data["features"] if feature["properties"]["NAME"] == selected_state), None
-        )
+        # Prebuilt boundary of the selected state, simplified for the map zoom
+        selected_state_feature = geometry.feature(selected_state, zoom=5)
         filtered_geojson_data = {
             "type": "FeatureCollection",
             "features": [selected_state_feature] if selected_state_feature else []
@@ -120,5 +103,5 @@ try:
             ],
         ))
 
-except FileNotFoundError:
-    st.write("The selected file does not exist. Please check your options.")
+except KeyError:
+    st.write("The selected table does not exist. Please check your options.")
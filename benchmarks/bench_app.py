@@ -0,0 +1,261 @@
+"""Benchmark suite for the Streamlit app and the operations behind it.
+
+Drives main.py headlessly with Streamlit's AppTest harness and times:
+
+    app   cold start (first run in a fresh interpreter), a warm full run and
+          the rerun after changing each sidebar widget
+    ops   per (state, unit type, category): csv read, label normalization,
+          store table load, the sidebar filter, the boundary lookup and
+          building and serializing the state's deck
+
+Results are written as JSON to benchmarks/results/ (or --output) so runs can
+be compared over time:
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --states 5 --reruns 3 --skip-app
+    python benchmarks/bench_app.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+
+# Sidebar widgets in the order main.py creates them
+SELECTBOXES = ["state", "housing_age", "structure", "size", "value", "category"]
+CHECKBOXES = {
+    "national_map": "Color the map by this category for all states",
+    "compare_all_states": "Compare all states",
+}
+BASE_STATE = "New Jersey"
+# The AppTest internals patch_script_wait relies on are private; this is the
+# version pinned in requirements.txt that they were checked against
+PINNED_STREAMLIT = "1.28.2"
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p90_ms": round(samples[min(len(samples) - 1, int(0.9 * len(samples)))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def wait_for_script(runner, timeout=3):
+    # AppTest polls for the end of a run every 100 ms, which would round every
+    # rerun up to a multiple of 100 ms; poll every millisecond instead
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if runner.script_stopped():
+            return
+        time.sleep(0.001)
+    runner.request_stop()
+    runner.join()
+    raise RuntimeError(f"AppTest script run timed out after {timeout}s")
+
+
+def patch_script_wait():
+    """Install wait_for_script in AppTest; returns whether it was installed.
+
+    It replaces the private local_script_runner.require_widgets_deltas, so
+    other Streamlit versions than PINNED_STREAMLIT keep AppTest's polling.
+    """
+    import streamlit
+    from streamlit.testing.v1 import local_script_runner
+
+    if streamlit.__version__ != PINNED_STREAMLIT or not hasattr(local_script_runner, "require_widgets_deltas"):
+        print(
+            f"Streamlit {streamlit.__version__} is not the pinned {PINNED_STREAMLIT}; "
+            "reruns are timed with AppTest's 100 ms polling",
+            file=sys.stderr,
+        )
+        return False
+    local_script_runner.require_widgets_deltas = wait_for_script
+    return True
+
+
+def check_run(app):
+    """Raise if the last run failed.
+
+    main.py catches its errors and shows them with st.error, so a broken
+    path would otherwise be timed as if it worked.
+    """
+    failures = [element.message for element in app.exception] + [element.value for element in app.error]
+    if failures:
+        raise RuntimeError(f"main.py failed: {failures[0]}")
+
+
+def bench_app(reruns, timeout):
+    """Time cold start, a warm run and the rerun after each widget change."""
+    from streamlit.testing.v1 import AppTest
+
+    patch_script_wait()
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=timeout)
+    # Nothing from the demographics package is imported yet, so the first
+    # run pays for imports, store opening and geometry loading
+    cold_ms, _ = timed(app.run)
+    check_run(app)
+
+    selectboxes = dict(zip(SELECTBOXES, app.selectbox))
+    selectboxes["state"].select(BASE_STATE)
+    warm_ms, _ = timed(app.run)
+    check_run(app)
+
+    widgets = {}
+    for position, name in enumerate(SELECTBOXES):
+        samples = []
+        for _ in range(reruns):
+            # Widgets further down can change their options, so look up afresh
+            widget = app.selectbox[position]
+            options = [option for option in widget.options if option != widget.value]
+            if name == "state":
+                options = [option for option in options if option != "Select a state"]
+            if not options:
+                break
+            widget.select(options[len(samples) % len(options)])
+            elapsed, _ = timed(app.run)
+            check_run(app)
+            samples.append(elapsed)
+        if samples:
+            widgets[name] = summarize(samples)
+        app.selectbox[0].select(BASE_STATE).run()
+
+    for name, label in CHECKBOXES.items():
+        samples = []
+        for _ in range(reruns):
+            checkbox = next(box for box in app.checkbox if box.label == label)
+            if checkbox.value:
+                checkbox.uncheck()
+            else:
+                checkbox.check()
+            elapsed, _ = timed(app.run)
+            check_run(app)
+            samples.append(elapsed)
+        widgets[name] = summarize(samples)
+        next(box for box in app.checkbox if box.label == label).uncheck().run()
+
+    return {"cold_start_ms": round(cold_ms, 3), "warm_run_ms": round(warm_ms, 3), "rerun": widgets}
+
+
+def bench_ops(state_limit=None):
+    """Time the operations behind one rerun for every state, unit and category."""
+    from demographics.data_access import get_store, load_geometry
+    from demographics.maps import US_CENTER, build_state_deck
+    from demographics.ingest import find_dm_files, normalize_labels, read_dm_csv
+    from demographics.selection import COMBINED_OPTIONS, STRUCTURE_TENURE_MAP, bedroom_options, bedroom_size
+    from demographics.store import CATEGORIES, UNIT_TYPES
+
+    store = get_store()
+    geometry = load_geometry()
+    files = find_dm_files(ROOT)
+    states = sorted({state for _, state, _ in files})[:state_limit]
+    structure_type, tenure = STRUCTURE_TENURE_MAP[COMBINED_OPTIONS[0]]
+    bedrooms = bedroom_size(bedroom_options(COMBINED_OPTIONS[0])[0])
+
+    timings = {}
+    for state in states:
+        feature_ms, _ = timed(geometry.feature, state, zoom=3)
+        # Uncached, as main.py builds it on the first selection of the state
+        deck_ms, _ = timed(lambda: build_state_deck(state, geometry.centroid(state) or US_CENTER).to_json())
+        for unit_type in UNIT_TYPES:
+            for category in CATEGORIES:
+                name = files.get((category, state, unit_type))
+                if name is None:
+                    continue
+                csv_ms, data = timed(read_dm_csv, os.path.join(ROOT, name), category)
+                normalize_ms, _ = timed(normalize_labels, data)
+                table_ms, _ = timed(store.table, category, state, unit_type)
+                filter_ms, _ = timed(
+                    store.select, category, state, unit_type, structure_type, tenure, bedrooms
+                )
+                timings[f"{state}/{unit_type}/{category}"] = {
+                    "csv_read": round(csv_ms, 3),
+                    "normalize": round(normalize_ms, 3),
+                    "table_load": round(table_ms, 3),
+                    "filter": round(filter_ms, 3),
+                    "feature_lookup": round(feature_ms, 3),
+                    "deck": round(deck_ms, 3),
+                }
+
+    operations = {
+        operation: summarize([entry[operation] for entry in timings.values()])
+        for operation in next(iter(timings.values()))
+    }
+    return {"combinations": len(timings), "operations": operations, "timings": timings}
+
+
+def compare(current, baseline):
+    """Print current vs baseline p50 for every shared measurement."""
+    rows = []
+    for name in ("cold_start_ms", "warm_run_ms"):
+        if name in current.get("app", {}) and name in baseline.get("app", {}):
+            rows.append((f"app.{name}", baseline["app"][name], current["app"][name]))
+    for section, key in (("app", "rerun"), ("ops", "operations")):
+        old = baseline.get(section, {}).get(key, {})
+        for name, stats in current.get(section, {}).get(key, {}).items():
+            if name in old:
+                rows.append((f"{section}.{name}.p50_ms", old[name]["p50_ms"], stats["p50_ms"]))
+    for name, old, new in rows:
+        change = (new - old) / old * 100 if old else float("nan")
+        print(f"{name:<40} {old:>10.3f} {new:>10.3f} {change:>+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=5, help="widget changes timed per widget")
+    parser.add_argument("--states", type=int, help="only time the first N states")
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest run timeout in seconds")
+    parser.add_argument("--skip-app", action="store_true", help="only time the raw operations")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    # main.py opens the glossary document relative to the working directory
+    os.chdir(ROOT)
+    started = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        "started": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    if not args.skip_app:
+        results["app"] = bench_app(args.reruns, args.timeout)
+    results["ops"] = bench_ops(args.states)
+
+    output = args.output or os.path.join(RESULTS_DIR, started.strftime("%Y%m%dT%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if "app" in results:
+        print(f"cold start {results['app']['cold_start_ms']:.1f} ms, warm run {results['app']['warm_run_ms']:.1f} ms")
+        for name, stats in results["app"]["rerun"].items():
+            print(f"  rerun {name:<20} p50 {stats['p50_ms']:>9.1f} ms  max {stats['max_ms']:>9.1f} ms")
+    print(f"{results['ops']['combinations']} combinations")
+    for name, stats in results["ops"]["operations"].items():
+        print(f"  {name:<20} p50 {stats['p50_ms']:>9.3f} ms  p90 {stats['p90_ms']:>9.3f} ms")
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
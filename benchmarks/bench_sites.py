@@ -0,0 +1,105 @@
+"""Time the site lookup: state of each coordinate and its multipliers.
+
+Draws --points random sites, each in the bounding box of a random state,
+and times building the StateLocator, locating the points and enrich_sites.
+A --check sample is also located by testing every point against every
+boundary edge of every state, which must give the same states:
+
+    python benchmarks/bench_sites.py --points 300000
+    python benchmarks/bench_sites.py --points 100000 --check 5000 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from demographics.data_access import load_geojson  # noqa: E402
+from demographics.geometry import StateLocator, _polygons  # noqa: E402
+from demographics.sites import enrich_sites  # noqa: E402
+
+DEFAULTS = {
+    "unit_type": "ALLunits",
+    "structure_type": "Single-Family Detached",
+    "tenure": "Own/Rent",
+    "bedrooms": "3 BR",
+}
+
+
+def random_sites(locator, count, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.array(locator.bounds)[rng.integers(len(locator.bounds), size=count)]
+    longitudes = rng.uniform(bounds[:, 0], bounds[:, 2])
+    latitudes = rng.uniform(bounds[:, 1], bounds[:, 3])
+    return latitudes, longitudes
+
+
+def brute_force(features, latitudes, longitudes):
+    """Even-odd test of every point against every edge, one state at a time."""
+    result = np.full(len(latitudes), -1, dtype=np.int64)
+    y = latitudes[:, None]
+    x = longitudes[:, None]
+    for number, feature in enumerate(features):
+        inside = np.zeros(len(latitudes), dtype=bool)
+        for polygon in _polygons(feature["geometry"]):
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)
+                x0, y0, x1, y1 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    crosses = ((y0 > y) != (y1 > y)) & (x < x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+                inside ^= crosses.sum(axis=1) % 2 == 1
+        result[inside & (result < 0)] = number
+    return result
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    value = function(*args)
+    return (time.perf_counter() - start) * 1000, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=300_000)
+    parser.add_argument("--check", type=int, default=2000, help="points to verify by brute force (0 skips)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    features = load_geojson()["features"]
+    build_ms, locator = timed(StateLocator, features)
+    latitudes, longitudes = random_sites(locator, args.points, args.seed)
+    locate_ms, located = timed(locator.locate, latitudes, longitudes)
+    sites = pd.DataFrame({"latitude": latitudes, "longitude": longitudes})
+    enrich_ms, enriched = timed(enrich_sites, sites, DEFAULTS)
+    results = {
+        "points": args.points,
+        "build_ms": round(build_ms, 1),
+        "locate_ms": round(locate_ms, 1),
+        "enrich_ms": round(enrich_ms, 1),
+        "located": int((located >= 0).sum()),
+        "with_multipliers": int(enriched["PERSONS"].notna().sum()),
+    }
+    if args.check:
+        sample = slice(0, min(args.check, args.points))
+        brute_ms, expected = timed(brute_force, features, latitudes[sample], longitudes[sample])
+        results["check_points"] = len(expected)
+        results["check_mismatches"] = int((expected != located[sample]).sum())
+        # Per point, for comparison with locate_ms / points
+        results["brute_force_us_per_point"] = round(brute_ms * 1000 / len(expected), 1)
+        results["locate_us_per_point"] = round(locate_ms * 1000 / args.points, 3)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, value in results.items():
+            print(f"{name:>26}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Load test for the demographic multipliers JSON service.
+
+Starts the service in-process (or targets --url), then runs --clients threads,
+each on its own keep-alive connection, issuing random GET /multipliers
+queries for --duration seconds. Prints throughput and latency percentiles.
+
+    python benchmarks/load_test_service.py --clients 16 --duration 10
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8502
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from demographics import selection  # noqa: E402
+from demographics.data_access import get_store  # noqa: E402
+
+
+def random_queries(count, seed=0):
+    """Return `count` query strings drawn from the app's vocabulary."""
+    rng = random.Random(seed)
+    states = sorted({key.split("/")[1] for key in get_store().partitions})
+    queries = []
+    for _ in range(count):
+        unit_type = rng.choice(list(selection.HOUSING_VALUES))
+        option = rng.choice(selection.COMBINED_OPTIONS)
+        params = {
+            "state": rng.choice(states),
+            "unit": unit_type,
+            "structure": option,
+            "size": rng.choice(selection.bedroom_options(option)),
+            "value": rng.choice(selection.HOUSING_VALUES[unit_type]),
+            "category": rng.choice(list(selection.CATEGORY_LABELS)),
+        }
+        queries.append("/multipliers?" + urlencode(params))
+    return queries
+
+
+def client(host, port, queries, deadline, latencies, errors):
+    connection = http.client.HTTPConnection(host, port)
+    while time.perf_counter() < deadline:
+        path = random.choice(queries)
+        start = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status not in (200, 304):
+            errors.append(response.status)
+    connection.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running service instead of starting one")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--distinct", type=int, default=2000, help="number of distinct queries")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        from demographics.service import serve_in_thread
+
+        server = serve_in_thread()
+        host, port = server.server_address
+
+    queries = random_queries(args.distinct)
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(host, port, queries, deadline, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    summary = {
+        "clients": args.clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        for name, value in summary.items():
+            print(f"{name:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
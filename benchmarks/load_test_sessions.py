@@ -0,0 +1,199 @@
+"""Load test for concurrent Streamlit sessions of main.py.
+
+Starts --sessions AppTest sessions of main.py in one process, the way the
+Streamlit server runs every browser tab on its own script thread, then has
+each session change a random sidebar widget and rerun for --duration
+seconds. Reports the resident memory each session adds and the rerun
+latency percentiles.
+
+    python benchmarks/load_test_sessions.py --sessions 30 --duration 20
+    python benchmarks/load_test_sessions.py --sessions 100 --duration 0 --json
+
+RSS per session is (RSS with every session open - RSS before the first
+session) / sessions, measured after a warm-up session has loaded the
+shared store and geometry, so it is what one more user costs.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import uuid
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_app import check_run, patch_script_wait, summarize  # noqa: E402
+from demographics.data_access import cache_info  # noqa: E402
+
+STATE_PLACEHOLDER = "Select a state"
+
+
+def rss_bytes():
+    """Return the current resident set size (the peak where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (FileNotFoundError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def install_runtime():
+    """Let AppTest sessions run concurrently, like sessions of one server.
+
+    AppTest installs a mock Runtime for each run and removes it afterwards,
+    which breaks other sessions' runs in flight, and compiles the script for
+    every run (which CPython 3.11 cannot do on several threads at once).
+    Install one Runtime for the whole test and share one script cache, as
+    the Streamlit server does.
+    """
+    from streamlit import logger
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    from streamlit.testing.v1.app_test import AppTest
+
+    # main.py's unlabeled selectbox would log a warning on every rerun
+    logger.set_log_level("error")
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    patch_script_wait()
+    script_cache = ScriptCache()
+
+    def run(self, widget_state=None, timeout=None):
+        runner = local_script_runner.LocalScriptRunner(self._script_path, self.session_state)
+        runner._script_cache = script_cache
+        runner._session_id = self.session_id
+        self._tree = runner.run(widget_state, self.query_params, timeout or self.default_timeout)
+        self._tree._runner = self
+        return self
+
+    AppTest._run = run
+    return AppTest
+
+
+def open_session(app_test, timeout):
+    app = app_test.from_file(os.path.join(ROOT, "main.py"), default_timeout=timeout)
+    app.session_id = uuid.uuid4().hex
+    app.run()
+    check_run(app)
+    return app
+
+
+def random_rerun(app, rng):
+    """Change one random sidebar selectbox or checkbox and rerun; returns the rerun ms."""
+    widgets = list(app.sidebar.selectbox) + list(app.sidebar.checkbox)
+    if not widgets:
+        raise RuntimeError("main.py rendered no sidebar widgets")
+    widget = rng.choice(widgets)
+    if hasattr(widget, "options"):
+        options = [option for option in widget.options if option not in (widget.value, STATE_PLACEHOLDER)]
+        if options:
+            widget.select(rng.choice(options))
+    elif widget.value:
+        widget.uncheck()
+    else:
+        widget.check()
+    start = time.perf_counter()
+    app.run()
+    return (time.perf_counter() - start) * 1000
+
+
+def session_worker(app, seed, deadline, latencies, errors):
+    rng = random.Random(seed)
+    # Every session starts from a state, like a user arriving at the app
+    app.sidebar.selectbox[0].select(rng.choice(app.sidebar.selectbox[0].options[1:]))
+    app.run()
+    while time.perf_counter() < deadline:
+        try:
+            latencies.append(random_rerun(app, rng))
+            check_run(app)
+        except Exception as error:
+            errors.append(repr(error))
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of random reruns")
+    parser.add_argument("--timeout", type=float, default=60.0, help="script run timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    # main.py opens the glossary document relative to the working directory
+    os.chdir(ROOT)
+    app_test = install_runtime()
+    # The warm-up session loads the store, geometry and module imports, which
+    # every later session shares
+    warm_up = open_session(app_test, args.timeout)
+    warm_up.sidebar.selectbox[0].select("New Jersey").run()
+    del warm_up
+    gc.collect()
+    baseline = rss_bytes()
+
+    start = time.perf_counter()
+    sessions = [open_session(app_test, args.timeout) for _ in range(args.sessions)]
+    open_ms = (time.perf_counter() - start) * 1000 / args.sessions
+
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=session_worker, args=(app, args.seed + number, deadline, latencies, errors))
+        for number, app in enumerate(sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    loaded = rss_bytes()
+
+    summary = {
+        "sessions": args.sessions,
+        "baseline_rss_mb": round(baseline / 2 ** 20, 1),
+        "rss_mb": round(loaded / 2 ** 20, 1),
+        "rss_per_session_kb": round((loaded - baseline) / args.sessions / 1024, 1),
+        "open_ms_per_session": round(open_ms, 1),
+        "reruns": len(latencies),
+        "reruns_per_second": round(len(latencies) / elapsed, 1),
+        "errors": len(errors),
+        # Shared by every session; part of the RSS growth
+        "cache_entries": cache_info()["size"],
+    }
+    if latencies:
+        latencies.sort()
+        stats = summarize(latencies)
+        summary.update({
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3),
+            "max_ms": stats["max_ms"],
+        })
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        for name, value in summary.items():
+            print(f"{name:>20}: {value}")
+        for error in errors[:5]:
+            print(f"error: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Demographic multiplier data shared by the Streamlit apps.
+
+The package has no UI dependencies. Submodules are imported on first
+attribute access, so `import demographics` stays cheap:
+
+    import demographics
+    demographics.query("New Jersey", "ALLunits",
+                       "Single-Family Detached (Combines Own and Rent tenure)", "3 BR")
+"""
+import importlib
+
+_EXPORTS = {
+    "query": "demographics.selection",
+    "resolve_table": "demographics.selection",
+    "dm_file_name": "demographics.selection",
+    "project": "demographics.projection",
+    "simulate": "demographics.simulation",
+    "rollup": "demographics.regions",
+    "enrich_sites": "demographics.sites",
+    "open_store": "demographics.store",
+    "build_store": "demographics.ingest",
+    "load_table": "demographics.data_access",
+    "load_geometry": "demographics.data_access",
+    "select_rows": "demographics.data_access",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'demographics' has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,5 @@
+import sys
+
+from demographics.cli import main
+
+sys.exit(main())
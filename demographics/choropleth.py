@@ -0,0 +1,70 @@
+"""National choropleth of one multiplier.
+
+`choropleth_data` joins every state's value onto its prebuilt, coordinate-
+rounded boundary (see demographics.geometry) and returns flat polygon records
+ready for a pydeck PolygonLayer. Results are cached per selection, so
+flipping back to a category the map has already shown costs a lookup.
+"""
+from demographics.compare import compare_states
+from demographics.data_access import load_geometry, memoize
+
+MAP_ZOOM = 3
+NO_DATA_COLOR = [200, 200, 200, 120]
+# Light yellow for the lowest value to dark red for the highest
+LOW_COLOR = (255, 237, 160)
+HIGH_COLOR = (189, 0, 38)
+FILL_ALPHA = 180
+
+
+def fill_color(value, low, high):
+    """Interpolate between LOW_COLOR and HIGH_COLOR; grey when missing."""
+    if value != value:
+        return NO_DATA_COLOR
+    share = 0.5 if high == low else (value - low) / (high - low)
+    return [round(a + (b - a) * share) for a, b in zip(LOW_COLOR, HIGH_COLOR)] + [FILL_ALPHA]
+
+
+def state_values(unit_type, combined_option, size, value="All Values",
+                 category_label="Household Size", measure=None, states=None):
+    """Return {GeoJSON NAME: value} for the selection."""
+    ranked = compare_states(
+        unit_type, combined_option, size, value, category_label, measure, states
+    )
+    measure = ranked.columns[3]
+    geometry = load_geometry()
+    values = {}
+    for state, number in zip(ranked["State"], ranked[measure]):
+        name = geometry.resolve(state)
+        # Aliases of one state (e.g. Washington D.C.) keep the first match
+        if name is not None and name not in values:
+            values[name] = float(number)
+    return values
+
+
+def choropleth_data(unit_type, combined_option, size, value="All Values",
+                    category_label="Household Size", measure=None, states=None,
+                    zoom=MAP_ZOOM):
+    """Return PolygonLayer records with state, value, fill and polygon."""
+    key = (
+        "choropleth", unit_type, combined_option, size, value, category_label, measure,
+        tuple(states) if states is not None else None, zoom,
+    )
+
+    def build():
+        values = state_values(
+            unit_type, combined_option, size, value, category_label, measure, states
+        )
+        present = [number for number in values.values() if number == number]
+        low = min(present, default=0.0)
+        high = max(present, default=0.0)
+        geometry = load_geometry()
+        records = []
+        for name, feature in geometry.simplified[geometry.nearest_zoom(zoom)].items():
+            number = values.get(name, float("nan"))
+            fill = fill_color(number, low, high)
+            label = "no data" if number != number else f"{number:.3f}"
+            for polygon in feature["geometry"]["coordinates"]:
+                records.append({"state": name, "value": label, "fill": fill, "polygon": polygon})
+        return records
+
+    return memoize(key, build)
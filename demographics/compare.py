@@ -0,0 +1,51 @@
+"""Compare one multiplier across every state.
+
+For a fixed housing age, structure and tenure, size, value band and
+category, `compare_states` pulls the matching row of every state out of the
+cached all-states frame with one vectorized filter, instead of reading one
+table per state.
+"""
+from demographics.data_access import load_frame
+from demographics.selection import (
+    CATEGORY_LABELS,
+    STATE_NAMES,
+    STRUCTURE_TENURE_MAP,
+    bedroom_size,
+    unit_type_code,
+)
+from demographics.store import STATISTICS
+
+# Multiplier compared by default for each category
+HEADLINE = {"pop": "PERSONS", "sac": "SAC", "psc": "PSC"}
+
+
+def compare_states(unit_type, combined_option, size, value="All Values",
+                   category_label="Household Size", measure=None, states=None):
+    """Return one row per state, sorted by `measure` with a Rank column.
+
+    `measure` defaults to the category's headline multiplier (PERSONS, SAC or
+    PSC). `states` limits the comparison to the given state names and
+    defaults to STATE_NAMES, so other spellings of a state are left out.
+    """
+    states = STATE_NAMES if states is None else states
+    names = {state.upper(): state for state in states}
+    category = CATEGORY_LABELS[category_label]
+    measure = measure or HEADLINE[category]
+    structure_type, tenure = STRUCTURE_TENURE_MAP[combined_option]
+    frame = load_frame(category)
+
+    mask = (
+        (frame["unit_type"] == unit_type_code(unit_type))
+        & (frame["structure_type"] == structure_type)
+        & (frame["tenure"] == tenure)
+        & (frame["bedrooms"] == bedroom_size(size))
+        & (frame["VALUE_TENURE"] == value)
+        & frame["state"].isin(list(names))
+    )
+
+    columns = [measure] + [column for column in STATISTICS if column != measure]
+    result = frame.loc[mask, ["state", "value_range"] + columns]
+    result = result.sort_values(measure, ascending=False, na_position="last")
+    result.insert(0, "Rank", result[measure].rank(ascending=False, method="min").astype("Int64"))
+    result["state"] = result["state"].map(names)
+    return result.rename(columns={"state": "State"}).reset_index(drop=True)
@@ -0,0 +1,328 @@
+"""Process-wide cache for the DM store, tables and state geometry.
+
+Streamlit re-executes the app script on every widget change, but imported
+modules stay loaded, so anything cached here is shared by every rerun and
+every session of the process. Entries are keyed by file path and mtime, so
+rebuilding the store or replacing the GeoJSON invalidates them on the next
+lookup.
+
+The store, the state geometry, the site locator and the database source are
+pinned: however many selections the sessions make, they stay loaded once
+per process rather than being evicted and reloaded. Tables and selections are built on
+read-only arrays (see demographics.store) and handed out as shallow copies,
+so a session can add columns to its copy but cannot write into the data
+other sessions see. Selections prefetched for a session (see
+demographics.prefetch) are held apart, in a cache bounded by bytes, until
+a session opens them.
+
+Tables come from the columnar store unless DM_DATA_SOURCE names a database
+(see demographics.sql); cached tables from a database are kept until the
+process restarts or clear_cache() is called.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from demographics.geometry import StateGeometry, StateLocator
+from demographics.store import DATA_DIR, STORE_DIR, open_store
+
+DATA_SOURCE = os.environ.get("DM_DATA_SOURCE")
+GEOJSON_PATH = os.path.join(DATA_DIR, "gz_2010_us_040_00_5m.json")
+GEOMETRY_PATH = os.path.join(STORE_DIR, "geometry.json")
+CACHE_SIZE = 128
+# Bound on the selections prefetched for sessions but not opened yet
+PREFETCH_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry.
+
+    Concurrent misses on one key run its loader once; the other callers wait
+    for that result. Entries loaded with a `slot` are pinned instead: they
+    are never evicted, and loading a new key into the slot (the same file
+    with a new mtime) replaces the old entry.
+
+    With `maxbytes`, entries are also evicted while their `sizeof` adds up
+    to more than `maxbytes`; the newest entry is always kept.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, maxbytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._pinned = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader, slot=None):
+        with self._lock:
+            if slot is not None and slot in self._pinned and self._pinned[slot][0] == key:
+                self.hits += 1
+                return self._pinned[slot][1]
+            if slot is None and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            pending = self._loading.get(key)
+            loading = pending is None
+            if loading:
+                pending = self._loading[key] = Future()
+        if not loading:
+            return pending.result()
+        # Load outside the lock so slow loads do not block cache hits
+        try:
+            value = loader()
+        except BaseException as error:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(error)
+            raise
+        with self._lock:
+            del self._loading[key]
+            if slot is not None:
+                self._pinned[slot] = (key, value)
+            else:
+                self._store(key, value)
+        pending.set_result(value)
+        return value
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self.bytes -= self._sizes.pop(key, 0)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.maxbytes is not None:
+            self._sizes[key] = self.sizeof(value)
+            self.bytes += self._sizes[key]
+        while len(self._entries) > self.maxsize or (
+            self.maxbytes is not None and self.bytes > self.maxbytes and len(self._entries) > 1
+        ):
+            evicted, _ = self._entries.popitem(last=False)
+            self.bytes -= self._sizes.pop(evicted, 0)
+
+    def pop(self, key):
+        """Remove an unpinned entry and return it; None if it is not cached."""
+        with self._lock:
+            self.bytes -= self._sizes.pop(key, 0)
+            return self._entries.pop(key, None)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def info(self):
+        with self._lock:
+            info = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "pinned": len(self._pinned),
+            }
+            if self.maxbytes is not None:
+                info.update(bytes=self.bytes, maxbytes=self.maxbytes)
+            return info
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+            self._pinned.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _frame_bytes(frame):
+    # Object columns count as pointers; their strings are shared vocabulary
+    return int(frame.memory_usage(index=True).sum())
+
+
+_cache = LRUCache()
+# Prefetched tables and selections wait here until a session opens them,
+# so speculative loads never evict what sessions are using
+_prefetched = LRUCache(maxbytes=PREFETCH_CACHE_BYTES, sizeof=_frame_bytes)
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+
+def get_store(store_dir=STORE_DIR):
+    """Return the shared DMStore, reopening it when the store is rebuilt."""
+    index_path = os.path.join(store_dir, "index.json")
+    key = ("store", index_path, _mtime(index_path))
+    return _cache.get_or_load(key, lambda: open_store(store_dir), slot=("store", index_path))
+
+
+def get_source(store_dir=STORE_DIR):
+    """Return the configured data source: the DMStore, or an SQLSource for DM_DATA_SOURCE.
+
+    Both offer has, count, table, select and frame.
+    """
+    if not DATA_SOURCE:
+        return get_store(store_dir)
+
+    def connect():
+        from demographics.sql import SQLSource
+
+        return SQLSource(DATA_SOURCE)
+
+    return _cache.get_or_load(("source", DATA_SOURCE), connect, slot=("source", DATA_SOURCE))
+
+
+def _table_key(category, state, unit_type, store_dir):
+    index_path = os.path.join(store_dir, "index.json")
+    return ("table", index_path, _mtime(index_path), category, state.upper(), unit_type)
+
+
+def _select_key(selection, store_dir):
+    index_path = os.path.join(store_dir, "index.json")
+    return ("select", index_path, _mtime(index_path)) + selection
+
+
+def _load(key, loader):
+    # A prefetched result moves into the shared cache once a session uses it
+    def load():
+        prefetched = _prefetched.pop(key)
+        return loader() if prefetched is None else prefetched
+
+    return _cache.get_or_load(key, load)
+
+
+def load_table(category, state, unit_type, store_dir=STORE_DIR):
+    """Return one DM table as a DataFrame.
+
+    The result is a shallow copy, so callers may add or drop columns without
+    touching the cached frame.
+    """
+    key = _table_key(category, state, unit_type, store_dir)
+    table = _load(key, lambda: get_source(store_dir).table(category, state, unit_type))
+    return table.copy(deep=False)
+
+
+def load_frame(category, store_dir=STORE_DIR):
+    """Return every table of a category as one DataFrame (see DMStore.frame).
+
+    The cached frame is shared; callers must not modify it in place.
+    """
+    index_path = os.path.join(store_dir, "index.json")
+    key = ("frame", index_path, _mtime(index_path), category)
+    return _cache.get_or_load(key, lambda: get_source(store_dir).frame(category))
+
+
+def select_rows(category, state, unit_type, structure_type, tenure, bedrooms, value=None,
+                store_dir=STORE_DIR):
+    """Return the rows of one sidebar selection as a DataFrame.
+
+    `value` is a VALUE_TENURE band; None keeps every band. Like load_table,
+    the result is a shallow copy of the cached frame.
+    """
+    selection = (category, state.upper(), unit_type, structure_type, tenure, bedrooms, value)
+    rows = _load(_select_key(selection, store_dir), lambda: get_source(store_dir).select(*selection))
+    return rows.copy(deep=False)
+
+
+def prefetch_rows(category, state, unit_type, structure_type, tenure, bedrooms, value=None,
+                  store_dir=STORE_DIR):
+    """Load a selection into the prefetch cache, unless it is cached already.
+
+    select_rows then serves it without touching the data source. Selecting
+    also builds the store's lookup index of the table, so other selections
+    on it are dictionary lookups too.
+    """
+    selection = (category, state.upper(), unit_type, structure_type, tenure, bedrooms, value)
+    key = _select_key(selection, store_dir)
+    if key not in _cache:
+        _prefetched.get_or_load(key, lambda: get_source(store_dir).select(*selection))
+
+
+def memoize(key, loader, store_dir=STORE_DIR, cache=None):
+    """Cache `loader()` under `key` until the store is rebuilt.
+
+    For results derived from the store, such as comparisons and map layers,
+    that are worth keeping across reruns. `cache` is an LRUCache to use
+    instead of the shared one, for large results with their own bound.
+    """
+    index_path = os.path.join(store_dir, "index.json")
+    key = ("memo", index_path, _mtime(index_path)) + tuple(key)
+    return (cache or _cache).get_or_load(key, loader)
+
+
+def load_geojson(path=GEOJSON_PATH):
+    """Return the parsed state boundaries GeoJSON."""
+    key = ("geojson", path, _mtime(path))
+
+    def load():
+        with open(path) as f:
+            return json.load(f)
+
+    return _cache.get_or_load(key, load, slot=("geojson", path))
+
+
+def load_geometry(path=GEOJSON_PATH, geometry_path=GEOMETRY_PATH):
+    """Return the StateGeometry index for the state boundaries.
+
+    Centroids and simplified boundaries are computed once and saved next to
+    the store, so later processes only read them back.
+    """
+    mtime = _mtime(path)
+    key = ("geometry", path, mtime)
+
+    def load():
+        geojson = load_geojson(path)
+        if os.path.exists(geometry_path):
+            with open(geometry_path) as f:
+                saved = json.load(f)
+            if saved.get("source") == [path, mtime]:
+                return StateGeometry(geojson, derived=saved)
+        geometry = StateGeometry(geojson)
+        saved = dict(geometry.derived(), source=[path, mtime])
+        directory = os.path.dirname(geometry_path)
+        os.makedirs(directory, exist_ok=True)
+        # Replace rather than overwrite, so other processes reading the file
+        # never see it half written; the temp name is unique per writer
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(saved, f)
+            os.replace(temp_path, geometry_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return geometry
+
+    return _cache.get_or_load(key, load, slot=("geometry", path))
+
+
+def load_locator(path=GEOJSON_PATH):
+    """Return the StateLocator for the full-resolution state boundaries."""
+    key = ("locator", path, _mtime(path))
+    return _cache.get_or_load(
+        key, lambda: StateLocator(load_geojson(path)["features"]), slot=("locator", path)
+    )
+
+
+def cache_info():
+    return _cache.info()
+
+
+def prefetch_cache_info():
+    return _prefetched.info()
+
+
+def clear_cache():
+    _cache.clear()
+    _prefetched.clear()
@@ -0,0 +1,123 @@
+"""Bulk export of the multiplier tables as a ZIP of CSV, Excel or Parquet files.
+
+    python -m demographics export --state "New Jersey" --format csv --output nj.zip
+    python -m demographics export --category "Persons by Age" --format parquet > ages.zip
+
+Every (category label, state, unit type) table is written with the columns
+its category label shows in the app (selection.LABELS_SELECTED), as
+"{category label}/DM_{category}_{STATE}_{unit}.{ext}". `iter_zip` yields the
+archive table by table, so memory stays bounded by one table whatever the
+scope.
+
+`export_zip` keeps built archives for the app in a cache of their own,
+bounded by ARCHIVE_CACHE_BYTES, so selections filling the shared cache do
+not evict them and make the next rerun rebuild one on the script thread.
+"""
+import io
+import time
+import zipfile
+
+from demographics.data_access import LRUCache, get_store, memoize
+from demographics.selection import CATEGORY_LABELS, LABELS_SELECTED, unit_type_code
+from demographics.store import UNIT_TYPES
+
+# Format shown in the app -> format name and file extension
+FORMAT_LABELS = {"CSV": "csv", "Excel": "xlsx", "Parquet": "parquet"}
+EXTENSIONS = {"csv": ".csv", "xlsx": ".xlsx", "parquet": ".parquet"}
+# Every "Everything" archive in all three formats is about 20 MB
+ARCHIVE_CACHE_BYTES = 64 * 1024 * 1024
+
+_archives = LRUCache(maxbytes=ARCHIVE_CACHE_BYTES, sizeof=len)
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink that collects what ZipFile writes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _write_csv(data, entry):
+    with io.TextIOWrapper(entry, encoding="utf-8", newline="") as text:
+        data.to_csv(text, index=False)
+
+
+def _write_xlsx(data, entry):
+    # Excel and Parquet writers need a seekable file; one table is small
+    buffer = io.BytesIO()
+    data.to_excel(buffer, index=False, engine="openpyxl")
+    entry.write(buffer.getvalue())
+
+
+def _write_parquet(data, entry):
+    buffer = io.BytesIO()
+    data.to_parquet(buffer, index=False)
+    entry.write(buffer.getvalue())
+
+
+WRITERS = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}
+
+
+def export_tables(state=None, category_label=None, unit_type=None):
+    """Yield (entry name, DataFrame) for every table in scope.
+
+    None for `state`, `category_label` or `unit_type` exports all of them.
+    """
+    store = get_store()
+    if category_label is not None and category_label not in CATEGORY_LABELS:
+        raise KeyError(f"Unknown category: {category_label}")
+    labels = [category_label] if category_label else list(CATEGORY_LABELS)
+    unit_types = [unit_type_code(unit_type)] if unit_type else UNIT_TYPES
+    if state is not None and not any(
+        store.has(CATEGORY_LABELS[label], state, unit) for label in labels for unit in unit_types
+    ):
+        raise KeyError(f"No data for {state}")
+
+    for label in labels:
+        category = CATEGORY_LABELS[label]
+        for key in store.partitions:
+            key_category, key_state, key_unit = key.split("/")
+            if key_category != category or key_unit not in unit_types:
+                continue
+            if state is not None and key != store.resolve(category, state, key_unit):
+                continue
+            data = store.table(category, key_state, key_unit)[LABELS_SELECTED[label]]
+            yield f"{label}/DM_{category}_{key_state}_{key_unit}", data
+
+
+def iter_zip(state=None, category_label=None, unit_type=None, fmt="csv"):
+    """Yield the bytes of a ZIP archive of the tables in scope, table by table."""
+    if fmt not in WRITERS:
+        raise KeyError(f"Unknown export format: {fmt}")
+    tables = export_tables(state, category_label, unit_type)
+    sink = _ChunkWriter()
+    # Parquet files are compressed already
+    compression = zipfile.ZIP_STORED if fmt == "parquet" else zipfile.ZIP_DEFLATED
+    created = time.localtime()[:6]
+    with zipfile.ZipFile(sink, "w", compression) as archive:
+        for name, data in tables:
+            info = zipfile.ZipInfo(name + EXTENSIONS[fmt], created)
+            info.compress_type = compression
+            with archive.open(info, "w") as entry:
+                WRITERS[fmt](data, entry)
+            yield sink.drain()
+    # The central directory is written when the archive closes
+    yield sink.drain()
+
+
+def export_zip(state=None, category_label=None, unit_type=None, fmt="csv"):
+    """Return the ZIP archive as bytes, built once per scope and shared by sessions."""
+    key = ("export_zip", state and state.upper(), category_label, unit_type, fmt)
+    return memoize(key, lambda: b"".join(iter_zip(state, category_label, unit_type, fmt)), cache=_archives)
@@ -0,0 +1,281 @@
+"""State boundary index built once from gz_2010_us_040_00_5m.json.
+
+The build gives a NAME / GEO_ID lookup, centroids derived from the polygons
+and, for each map zoom level, a simplified boundary with coordinates rounded
+to what that zoom can show. Apps pick the small prebuilt feature instead of
+scanning the features list and shipping the full 5m-resolution outline.
+
+StateLocator answers the reverse question, which state a coordinate lies
+in, for whole arrays of points at once against the full-resolution outlines.
+"""
+import numpy as np
+
+# Map zoom -> (simplification tolerance in degrees, decimals kept)
+ZOOM_LEVELS = {
+    3: (0.05, 2),
+    5: (0.01, 3),
+    7: (0.002, 4),
+}
+
+# Latitude degrees per strip of StateLocator's edge index
+STRIP_HEIGHT = 0.05
+# Upper bound on the (point, edge) pairs tested at once
+LOCATE_CHUNK_PAIRS = 2_000_000
+
+# Names used by the apps that differ from the GeoJSON NAME property
+STATE_ALIASES = {
+    "Washington D.C.": "District of Columbia",
+    "Washington.Dc.": "District of Columbia",
+    "Dc": "District of Columbia",
+}
+
+
+def _polygons(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def _ring_area_centroid(ring):
+    """Return the signed area and centroid of a closed ring (shoelace)."""
+    x = ring[:, 0]
+    y = ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, ring[:, 0].mean(), ring[:, 1].mean()
+    cx = ((x[:-1] + x[1:]) * cross).sum() / (6 * area)
+    cy = ((y[:-1] + y[1:]) * cross).sum() / (6 * area)
+    return area, cx, cy
+
+
+def polygon_centroid(geometry):
+    """Return (latitude, longitude) of the largest polygon's centroid.
+
+    Using the largest part keeps states such as Alaska, whose islands cross
+    the antimeridian, centred on their main landmass.
+    """
+    best = None
+    for polygon in _polygons(geometry):
+        area, cx, cy = _ring_area_centroid(np.asarray(polygon[0], dtype=np.float64))
+        if best is None or abs(area) > abs(best[0]):
+            best = (area, cx, cy)
+    return best[2], best[1]
+
+
+def simplify_ring(ring, tolerance):
+    """Douglas-Peucker simplification of one closed ring."""
+    if len(ring) <= 4:
+        return ring
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = ring[start + 1:end]
+        origin = ring[start]
+        direction = ring[end] - origin
+        length = np.hypot(direction[0], direction[1])
+        offsets = segment - origin
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return ring[keep]
+
+
+def simplify_geometry(geometry, tolerance, decimals):
+    """Return a simplified, coordinate-rounded MultiPolygon or None."""
+    polygons = []
+    for polygon in _polygons(geometry):
+        rings = []
+        for position, ring in enumerate(polygon):
+            ring = np.round(simplify_ring(np.asarray(ring, dtype=np.float64), tolerance), decimals)
+            # Rounding can create repeated vertices; drop them but keep the ring closed
+            repeated = np.all(ring[1:] == ring[:-1], axis=1)
+            ring = ring[np.concatenate(([True], ~repeated))]
+            if len(ring) >= 4 and abs(_ring_area_centroid(ring)[0]) >= tolerance ** 2:
+                rings.append(ring.tolist())
+            elif position == 0:
+                # An outer ring that vanished takes its holes with it
+                break
+        if rings:
+            polygons.append(rings)
+    if not polygons:
+        return None
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+class StateGeometry:
+    """Lookup tables over the state features of one GeoJSON document.
+
+    `derived` is the output of a previous `derived()` call for the same
+    document; passing it skips recomputing centroids and simplifications.
+    """
+
+    def __init__(self, geojson, zoom_levels=ZOOM_LEVELS, derived=None):
+        self.by_name = {}
+        self.by_geo_id = {}
+        for feature in geojson["features"]:
+            properties = feature["properties"]
+            self.by_name[properties["NAME"]] = feature
+            self.by_geo_id[properties["GEO_ID"]] = feature
+
+        if derived is not None:
+            self.centroids = {name: tuple(point) for name, point in derived["centroids"].items()}
+            self.simplified = {
+                int(zoom): features for zoom, features in derived["simplified"].items()
+            }
+            return
+
+        self.centroids = {}
+        self.simplified = {zoom: {} for zoom in zoom_levels}
+        for name, feature in self.by_name.items():
+            self.centroids[name] = polygon_centroid(feature["geometry"])
+            for zoom, (tolerance, decimals) in zoom_levels.items():
+                geometry = simplify_geometry(feature["geometry"], tolerance, decimals)
+                if geometry is None:
+                    # Too small to simplify at this zoom; fall back to the outline
+                    geometry = feature["geometry"]
+                self.simplified[zoom][name] = {
+                    "type": "Feature",
+                    "properties": dict(feature["properties"]),
+                    "geometry": geometry,
+                }
+
+    def derived(self):
+        """Return the computed centroids and boundaries as JSON-ready data."""
+        return {"centroids": self.centroids, "simplified": self.simplified}
+
+    def resolve(self, name):
+        """Return the GeoJSON NAME for an app state name, or None."""
+        if name in self.by_name:
+            return name
+        name = name.title()
+        name = STATE_ALIASES.get(name, name)
+        return name if name in self.by_name else None
+
+    def nearest_zoom(self, zoom):
+        return min(self.simplified, key=lambda level: abs(level - zoom))
+
+    def feature(self, name, zoom=None):
+        """Return a state's feature, simplified for `zoom` when given."""
+        name = self.resolve(name)
+        if name is None:
+            return None
+        if zoom is None:
+            return self.by_name[name]
+        return self.simplified[self.nearest_zoom(zoom)][name]
+
+    def feature_collection(self, names, zoom=None):
+        features = [self.feature(name, zoom) for name in names]
+        return {"type": "FeatureCollection", "features": [f for f in features if f]}
+
+    def centroid(self, name):
+        """Return (latitude, longitude) for a state, or None."""
+        name = self.resolve(name)
+        return self.centroids.get(name) if name else None
+
+
+class StateLocator:
+    """Batched point-in-polygon lookup of the state containing each point.
+
+    Every state's boundary edges are bucketed into horizontal strips of
+    `strip_height` degrees. Points are sorted by latitude once; each state
+    takes the slice within its bounding box and tests those points only
+    against the edges of their strip. A point is inside when a ray to its
+    east crosses an odd number of edges, which also handles holes and
+    islands. Points on a shared border go to one of the states.
+    """
+
+    def __init__(self, features, strip_height=STRIP_HEIGHT):
+        self.strip_height = strip_height
+        self.names = []
+        self.bounds = []
+        self._strips = []
+        for feature in features:
+            rings = [
+                np.asarray(ring, dtype=np.float64)
+                for polygon in _polygons(feature["geometry"])
+                for ring in polygon
+            ]
+            start = np.concatenate([ring[:-1] for ring in rings])
+            end = np.concatenate([ring[1:] for ring in rings])
+            points = np.concatenate(rings)
+            west, south = points.min(axis=0)
+            east, north = points.max(axis=0)
+            self.names.append(feature["properties"]["NAME"])
+            self.bounds.append((west, south, east, north))
+            self._strips.append(self._index_edges(start, end, south, north))
+
+    def _index_edges(self, start, end, south, north):
+        """Return (strip offsets, x0, y0, y1, dx/dy) of the edges in strip order."""
+        # Horizontal edges never cross an east-going ray
+        sloped = start[:, 1] != end[:, 1]
+        start = start[sloped]
+        end = end[sloped]
+        strips = int((north - south) // self.strip_height) + 1
+        low = ((np.minimum(start[:, 1], end[:, 1]) - south) // self.strip_height).astype(np.int64)
+        high = ((np.maximum(start[:, 1], end[:, 1]) - south) // self.strip_height).astype(np.int64)
+        # One entry per (edge, strip it spans)
+        counts = high - low + 1
+        edges = np.repeat(np.arange(len(start)), counts)
+        strip = np.repeat(low - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        order = np.argsort(strip, kind="stable")
+        edges = edges[order]
+        offsets = np.searchsorted(strip[order], np.arange(strips + 1))
+        x0, y0 = start[edges, 0], start[edges, 1]
+        y1 = end[edges, 1]
+        slope = (end[edges, 0] - x0) / (y1 - y0)
+        return offsets, x0, y0, y1, slope
+
+    def locate(self, latitudes, longitudes):
+        """Return the index into `names` of each point's state, -1 for none."""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        result = np.full(len(latitudes), -1, dtype=np.int64)
+        # NaN coordinates sort last and fall outside every bounding box
+        order = np.argsort(latitudes, kind="stable")
+        sorted_latitudes = latitudes[order]
+        for number, (west, south, east, north) in enumerate(self.bounds):
+            first = np.searchsorted(sorted_latitudes, south, "left")
+            last = np.searchsorted(sorted_latitudes, north, "right")
+            candidates = order[first:last]
+            x = longitudes[candidates]
+            candidates = candidates[(x >= west) & (x <= east) & (result[candidates] < 0)]
+            if len(candidates):
+                inside = self._inside(number, latitudes[candidates], longitudes[candidates])
+                result[candidates[inside]] = number
+        return result
+
+    def _inside(self, number, y, x):
+        offsets, x0, y0, y1, slope = self._strips[number]
+        south = self.bounds[number][1]
+        strip = np.clip(((y - south) // self.strip_height).astype(np.int64), 0, len(offsets) - 2)
+        counts = offsets[strip + 1] - offsets[strip]
+        inside = np.zeros(len(y), dtype=bool)
+        # Split the points so that no chunk tests more than LOCATE_CHUNK_PAIRS pairs
+        ends = np.cumsum(counts)
+        begin = 0
+        while begin < len(y):
+            limit = ends[begin] - counts[begin] + LOCATE_CHUNK_PAIRS
+            stop = max(begin + 1, int(np.searchsorted(ends, limit, "right")))
+            chunk_counts = counts[begin:stop]
+            total = int(chunk_counts.sum())
+            point = np.repeat(np.arange(stop - begin), chunk_counts)
+            edge = np.repeat(offsets[strip[begin:stop]] - (np.cumsum(chunk_counts) - chunk_counts),
+                             chunk_counts) + np.arange(total)
+            py = y[begin:stop][point]
+            crosses = (y0[edge] > py) != (y1[edge] > py)
+            crosses &= x[begin:stop][point] < x0[edge] + (py - y0[edge]) * slope[edge]
+            inside[begin:stop] = np.bincount(point[crosses], minlength=stop - begin) % 2 == 1
+            begin = stop
+        return inside
@@ -0,0 +1,275 @@
+"""Build the columnar store from the DM_{category}_{STATE}_{unit}.csv files.
+
+Run after the CSVs change; only new or changed files are parsed:
+
+    python -m demographics.ingest
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from demographics.store import (
+    CATEGORIES,
+    CODE_COLUMNS,
+    DATA_DIR,
+    LABEL_COLUMNS,
+    MEASURES,
+    PARSED_COLUMNS,
+    STORE_DIR,
+    STORE_VERSION,
+    partition_key,
+)
+
+DM_FILE_PATTERN = re.compile(r"^DM_(pop|sac|psc)_(.+)_(ALLunits|NEWERunits)\.csv$")
+
+# Column headers that were mangled by spreadsheet software in some exports
+COLUMN_FIXES = {"17-May": "5-17"}
+# Suppressed estimates are exported as a bare "."
+MISSING_VALUES = ["."]
+
+# "Single-Family Detached  (Own/Rent), 2 BR" -> type, tenure, bedrooms
+STRUCTURE_PATTERN = re.compile(r"^\s*(.*?)\s*\(\s*(.*?)\s*\)\s*,?\s*(.*?)\s*$")
+
+
+def find_dm_files(data_dir=DATA_DIR):
+    """Return {(category, STATE, unit_type): file name} for every DM csv."""
+    files = {}
+    for name in sorted(os.listdir(data_dir)):
+        match = DM_FILE_PATTERN.match(name)
+        if match:
+            category, state, unit_type = match.groups()
+            files[(category, state.upper(), unit_type)] = name
+    return files
+
+
+def read_dm_csv(path, category):
+    """Read one DM csv and align it to the category's measure columns."""
+    data = pd.read_csv(
+        path, dtype={column: str for column in LABEL_COLUMNS}, na_values=MISSING_VALUES
+    )
+    data = data.rename(columns=COLUMN_FIXES)
+    # Older exports lack the statistics columns; keep the layout uniform
+    return data.reindex(columns=LABEL_COLUMNS + MEASURES[category])
+
+
+def parse_structure(structure):
+    """Split a Structure label into (structure_type, tenure, bedrooms)."""
+    match = STRUCTURE_PATTERN.match(structure)
+    if match is None:
+        raise ValueError(f"Unrecognised Structure label: {structure!r}")
+    return match.groups()
+
+
+def normalize_labels(data):
+    """Add the parsed Structure columns and clean up VALUE_TENURE."""
+    parsed = {structure: parse_structure(structure) for structure in data["Structure"].unique()}
+    for position, column in enumerate(PARSED_COLUMNS):
+        data[column] = data["Structure"].map(lambda structure: parsed[structure][position])
+    # Value bands carry stray padding ("    Below Median", "Third Tercile ")
+    data["VALUE_TENURE"] = data["VALUE_TENURE"].str.strip()
+    # Some exports repeat the Structure label on the "All Values" row
+    repeated = data["VALUE_TENURE"] == data["Structure"].str.strip()
+    data.loc[repeated, "VALUE_TENURE"] = "All Values"
+    return data
+
+
+def file_checksum(path):
+    """Return the sha256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_index(store_dir=STORE_DIR):
+    """Return the store's index, or None if it is missing or outdated."""
+    try:
+        with open(os.path.join(store_dir, "index.json")) as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return index if index.get("version") == STORE_VERSION else None
+
+
+def scan_sources(files, data_dir=DATA_DIR, previous=None):
+    """Return {file name: source record} with a checksum for every file.
+
+    Files whose size and mtime match the previous index keep their recorded
+    checksum instead of being hashed again.
+    """
+    previous = previous or {}
+    sources = {}
+    for key, name in files.items():
+        stat = os.stat(os.path.join(data_dir, name))
+        old = previous.get(name)
+        if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+            checksum = old["sha256"]
+        else:
+            checksum = file_checksum(os.path.join(data_dir, name))
+        sources[name] = {
+            "partition": partition_key(*key),
+            "sha256": checksum,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+    return sources
+
+
+def _encode(data, vocab):
+    codes = np.empty((len(data), len(CODE_COLUMNS)), dtype=np.int16)
+    for position, column in enumerate(CODE_COLUMNS):
+        # -1 marks a missing label (e.g. value_range on "All Values" rows)
+        codes[:, position] = [
+            -1 if pd.isna(value) else vocab[column].setdefault(value, len(vocab[column]))
+            for value in data[column]
+        ]
+    return codes
+
+
+def _write_new(store_dir, prefix, suffix, write):
+    """Write a new file with a name unique to this writer and return its path."""
+    fd, path = tempfile.mkstemp(dir=store_dir, prefix=prefix, suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates the file private to its owner
+        os.chmod(path, 0o644)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _save(store_dir, name, array):
+    """Write `array` to a new file and return its name.
+
+    Arrays are never overwritten: every build writes its own files and
+    publishes them by replacing index.json, so readers always pair an index
+    with the arrays it names.
+    """
+    return os.path.basename(_write_new(store_dir, f"{name}.", ".npy", lambda f: np.save(f, array)))
+
+
+def _array_files(arrays):
+    return {name for files in arrays.values() for name in files.values()}
+
+
+def build_store(data_dir=DATA_DIR, store_dir=STORE_DIR, full=False):
+    """Write the memory-mappable store, parsing only new or changed csvs.
+
+    Every file is identified by the sha256 of its bytes. Files with identical
+    content are stored once: the first partition owns the rows and the others
+    are recorded in the index's alias table, pointing at the same rows.
+    Content already in the previous store is copied over without parsing its
+    csv again; `full=True` ignores the previous store.
+
+    The arrays go to new files and the build is published by replacing
+    index.json. The previous build's arrays are kept until the next build,
+    for readers that opened the index just before it was replaced.
+    """
+    files = find_dm_files(data_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    previous = None if full else load_index(store_dir)
+    if previous and not all(
+        os.path.exists(os.path.join(store_dir, name)) for name in _array_files(previous["arrays"])
+    ):
+        previous = None
+
+    sources = scan_sources(files, data_dir, previous and previous["sources"])
+    # Appending to the previous vocabulary keeps its codes valid
+    vocab = {
+        column: {value: code for code, value in enumerate(previous["vocab"][column])} if previous else {}
+        for column in CODE_COLUMNS
+    }
+    old_blocks = previous["blocks"] if previous else {}
+    blocks = {}
+    partitions = {}
+    aliases = {}
+    arrays = {}
+    parsed = reused = 0
+    for category in CATEGORIES:
+        if previous:
+            old_files = previous["arrays"][category]
+            old_codes = np.load(os.path.join(store_dir, old_files["codes"]), mmap_mode="r")
+            old_measures = np.load(os.path.join(store_dir, old_files["measures"]), mmap_mode="r")
+        codes = []
+        measures = []
+        start = 0
+        for (file_category, state, unit_type), name in files.items():
+            if file_category != category:
+                continue
+            key = partition_key(category, state, unit_type)
+            checksum = sources[name]["sha256"]
+            if checksum in blocks:
+                aliases[key] = blocks[checksum]["partition"]
+                partitions[key] = partitions[aliases[key]]
+                continue
+            if checksum in old_blocks:
+                old_start, old_stop = old_blocks[checksum]["rows"]
+                codes.append(np.array(old_codes[old_start:old_stop]))
+                measures.append(np.array(old_measures[old_start:old_stop]))
+                reused += 1
+            else:
+                data = normalize_labels(read_dm_csv(os.path.join(data_dir, name), category))
+                codes.append(_encode(data, vocab))
+                measures.append(data[MEASURES[category]].to_numpy(dtype=np.float32))
+                parsed += 1
+            stop = start + len(codes[-1])
+            blocks[checksum] = {"partition": key, "rows": [start, stop]}
+            partitions[key] = [start, stop]
+            start = stop
+
+        arrays[category] = {
+            "codes": _save(store_dir, f"{category}.codes", np.concatenate(codes)),
+            "measures": _save(store_dir, f"{category}.measures", np.concatenate(measures)),
+        }
+
+    index = {
+        "version": STORE_VERSION,
+        "measures": MEASURES,
+        "vocab": {column: list(values) for column, values in vocab.items()},
+        "partitions": partitions,
+        "aliases": aliases,
+        "arrays": arrays,
+        "blocks": blocks,
+        "sources": sources,
+        "build": {"parsed": parsed, "reused": reused},
+    }
+    # Readers that opened the index being replaced may still be loading its
+    # arrays. It is read again here, not at the start, so that the arrays of
+    # a concurrent build that published meanwhile are retired, not orphaned.
+    replaced = load_index(store_dir)
+    index["retired"] = replaced["arrays"] if replaced else {}
+    # Replacing index.json publishes the whole build at once
+    temp_path = _write_new(store_dir, "index.", ".tmp", lambda f: f.write(json.dumps(index).encode()))
+    os.replace(temp_path, os.path.join(store_dir, "index.json"))
+    # Arrays the replaced index retired belong to an index replaced a whole
+    # build ago
+    if replaced:
+        unused = _array_files(replaced["retired"]) - _array_files(arrays) - _array_files(index["retired"])
+    else:
+        # Stores before version 4 kept one fixed file name per array
+        unused = {f"{category}.{part}.npy" for category in CATEGORIES for part in ("codes", "measures")}
+    for name in unused:
+        try:
+            os.unlink(os.path.join(store_dir, name))
+        except FileNotFoundError:
+            pass
+    return index
+
+
+if __name__ == "__main__":
+    from demographics.validation import summary, write_report
+
+    index = build_store()
+    print(
+        f"Stored {len(index['partitions'])} tables in {STORE_DIR}; "
+        f"parsed {index['build']['parsed']}, reused {index['build']['reused']}"
+    )
+    print(summary(write_report()))
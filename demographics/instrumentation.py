@@ -0,0 +1,190 @@
+"""Opt-in timing spans for the phases of an app rerun.
+
+Tracing is off unless DM_TRACE=1 is set in the environment; disabled spans
+cost one attribute lookup. When on, every finished trace is
+
+    - added to the process-wide phase metrics (PHASE_METRICS), rendered in
+      Prometheus text format by `prometheus_text`,
+    - appended as one JSON line to DM_TRACE_LOG, if set, and
+    - written as a Prometheus textfile to DM_METRICS_FILE, if set, for the
+      node exporter's textfile collector (Streamlit cannot serve /metrics).
+
+    trace = Trace("main", session=session_id)
+    with trace.span("filter") as span:
+        rows = select_rows(...)
+        span["rows"] = len(rows)
+    trace.finish()
+
+`python -m demographics trace LOG` summarizes a JSON-lines log.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("DM_TRACE", "") not in ("", "0")
+TRACE_LOG = os.environ.get("DM_TRACE_LOG")
+METRICS_FILE = os.environ.get("DM_METRICS_FILE")
+# Histogram bucket bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PhaseMetrics:
+    """Thread-safe per-phase duration histograms and row/byte counters."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase, seconds, rows=0, nbytes=0):
+        with self._lock:
+            entry = self._phases.get(phase)
+            if entry is None:
+                entry = self._phases[phase] = {
+                    "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0, "rows": 0, "bytes": 0,
+                }
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][position] += 1
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["rows"] += rows
+            entry["bytes"] += nbytes
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP dm_phase_seconds Time spent in each phase of an app rerun.",
+            "# TYPE dm_phase_seconds histogram",
+        ]
+        with self._lock:
+            phases = {phase: dict(entry) for phase, entry in sorted(self._phases.items())}
+        for phase, entry in phases.items():
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f'dm_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'dm_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'dm_phase_seconds_sum{{phase="{phase}"}} {entry["sum"]:.6f}')
+            lines.append(f'dm_phase_seconds_count{{phase="{phase}"}} {entry["count"]}')
+        for name, help_text in (("rows", "Rows processed"), ("bytes", "Bytes processed")):
+            lines.append(f"# HELP dm_phase_{name}_total {help_text} by each phase of an app rerun.")
+            lines.append(f"# TYPE dm_phase_{name}_total counter")
+            for phase, entry in phases.items():
+                lines.append(f'dm_phase_{name}_total{{phase="{phase}"}} {entry[name]}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._phases.clear()
+
+
+PHASE_METRICS = PhaseMetrics()
+_log_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ("trace", "record", "start")
+
+    def __init__(self, trace, phase):
+        self.trace = trace
+        self.record = {"phase": phase}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record["ms"] = round((time.perf_counter() - self.start) * 1000, 3)
+        self.trace.spans.append(self.record)
+        return False
+
+
+class Trace:
+    """The spans of one app rerun."""
+
+    def __init__(self, name, session=None, enabled=None):
+        self.name = name
+        self.session = session
+        self.enabled = ENABLED if enabled is None else enabled
+        self.spans = []
+        self.started = time.time()
+        self._start = time.perf_counter()
+
+    def span(self, phase):
+        """Time a block; the yielded dict takes optional "rows" and "bytes"."""
+        if not self.enabled:
+            return nullcontext({})
+        return _Span(self, phase)
+
+    def finish(self):
+        """Record the trace in the metrics, log and metrics file; returns it as a dict."""
+        total_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        record = {
+            "ts": round(self.started, 3),
+            "trace": self.name,
+            "session": self.session,
+            "total_ms": total_ms,
+            "spans": self.spans,
+        }
+        if not self.enabled:
+            return record
+        PHASE_METRICS.observe(self.name, total_ms / 1000)
+        for span in self.spans:
+            PHASE_METRICS.observe(span["phase"], span["ms"] / 1000, span.get("rows", 0), span.get("bytes", 0))
+        if TRACE_LOG:
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            with _log_lock, open(TRACE_LOG, "a") as f:
+                f.write(line)
+        if METRICS_FILE:
+            write_metrics_file(METRICS_FILE)
+        return record
+
+
+def prometheus_text():
+    return PHASE_METRICS.prometheus_text()
+
+
+def write_metrics_file(path):
+    # Replaced atomically so the collector never reads a partial file. The
+    # temp name is unique per writer, since several processes may share the
+    # file; the lock keeps this process's sessions from replacing a newer
+    # snapshot with an older one.
+    with _log_lock:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(prometheus_text())
+            # mkstemp creates the file private to this user; the collector
+            # may run as another
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def summarize_log(path):
+    """Return {phase: {count, p50_ms, p95_ms, max_ms, rows, bytes}} for a JSON-lines log."""
+    durations = defaultdict(list)
+    totals = defaultdict(lambda: {"rows": 0, "bytes": 0})
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            durations[record["trace"]].append(record["total_ms"])
+            for span in record["spans"]:
+                durations[span["phase"]].append(span["ms"])
+                totals[span["phase"]]["rows"] += span.get("rows", 0)
+                totals[span["phase"]]["bytes"] += span.get("bytes", 0)
+    summary = {}
+    for phase, samples in durations.items():
+        samples.sort()
+        summary[phase] = {
+            "count": len(samples),
+            "p50_ms": samples[len(samples) // 2],
+            "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+            "max_ms": samples[-1],
+            **totals[phase],
+        }
+    return summary
@@ -0,0 +1,116 @@
+"""pydeck map builders for the Streamlit apps.
+
+Unlike the rest of the package this module imports pydeck. Decks are
+serialized to JSON once when built; st.pydeck_chart asks for the JSON on
+every rerun, so cached decks skip re-serializing their layers.
+
+Layers get fixed ids (pydeck defaults to a random one per layer), so a
+cached deck has the same spec on every rerun. The browser then keeps the
+map it has instead of rebuilding it, and with a low
+global.minCachedMessageSize (see .streamlit/config.toml) Streamlit sends
+only the hash of a map the browser already has.
+"""
+import json
+
+import pydeck as pdk
+
+from demographics.choropleth import MAP_ZOOM, choropleth_data
+from demographics.data_access import load_geometry, memoize
+
+MAP_STYLE = "mapbox://styles/mapbox/light-v9"
+US_CENTER = (38.526600, -96.726486)
+
+
+class SerializedDeck(pdk.Deck):
+    """A Deck whose JSON spec is computed once and reused.
+
+    pydeck pretty-prints its JSON; the spec is re-encoded without whitespace,
+    which roughly halves what is sent to the browser.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._spec = json.dumps(json.loads(super().to_json()), separators=(",", ":"))
+
+    def to_json(self):
+        return self._spec
+
+
+def choropleth_deck(unit_type, combined_option, size, value="All Values",
+                    category_label="Household Size", measure=None, states=None):
+    """Return a cached deck coloring every state by the selected multiplier."""
+    key = (
+        "choropleth_deck", unit_type, combined_option, size, value, category_label, measure,
+        tuple(states) if states is not None else None,
+    )
+
+    def build():
+        records = choropleth_data(
+            unit_type, combined_option, size, value, category_label, measure, states
+        )
+        return SerializedDeck(
+            map_style=MAP_STYLE,
+            initial_view_state=pdk.ViewState(
+                latitude=US_CENTER[0], longitude=US_CENTER[1], zoom=MAP_ZOOM, pitch=0
+            ),
+            layers=[
+                pdk.Layer(
+                    "PolygonLayer",
+                    records,
+                    id="choropleth",
+                    get_polygon="polygon",
+                    get_fill_color="fill",
+                    get_line_color=[255, 255, 255, 200],
+                    line_width_min_pixels=1,
+                    stroked=True,
+                    filled=True,
+                    pickable=True,
+                )
+            ],
+            tooltip={"text": "{state}: {value}"},
+        )
+
+    return memoize(key, build)
+
+
+def build_state_deck(name=None, center=US_CENTER, states=None):
+    """Return a deck marking one state, or the member states of a rollup.
+
+    `center` places the state's marker; `states` outlines several states
+    instead of `name`. Without a name the deck is an empty map of the U.S.
+    """
+    view = pdk.ViewState(latitude=US_CENTER[0], longitude=US_CENTER[1], zoom=MAP_ZOOM, pitch=0)
+    if name is None:
+        return SerializedDeck(map_style=MAP_STYLE, initial_view_state=view)
+    boundaries = load_geometry().feature_collection(states or [name], zoom=MAP_ZOOM)
+    return SerializedDeck(
+        map_style=MAP_STYLE,
+        initial_view_state=view,
+        layers=[
+            pdk.Layer(
+                "ScatterplotLayer",
+                [{"latitude": center[0], "longitude": center[1], "state": name}],
+                id="state-marker",
+                get_position="[longitude, latitude]",
+                pickable=True,
+            ),
+            pdk.Layer(
+                "GeoJsonLayer",
+                boundaries,
+                id="state-boundary",
+                pickable=True,
+                stroked=True,
+                filled=True,
+                extruded=False,
+                line_width_min_pixels=2,
+                get_fill_color=[255, 0, 0, 80],
+                get_line_color=[255, 0, 0, 255],
+            ),
+        ],
+    )
+
+
+def state_deck(name=None, center=US_CENTER, states=None):
+    """Return the cached `build_state_deck` deck, built once per state."""
+    key = ("state_deck", name, tuple(center), tuple(states) if states else None)
+    return memoize(key, lambda: build_state_deck(name, center, states))
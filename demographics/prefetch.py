@@ -0,0 +1,111 @@
+"""Background prefetch of the selections a user is likely to open next.
+
+After picking a state, users tend to flip between categories and housing
+ages. When the state changes, `Prefetcher.prefetch_selection` runs the same
+selection against the sibling (category, unit type) tables, on a small
+thread pool shared by every session. That also builds the store's lookup
+index of each sibling table, so other sidebar changes prefetch nothing:
+their selections are dictionary lookups.
+
+Results wait in data_access's prefetch cache, bounded by
+PREFETCH_CACHE_BYTES, and move into the shared cache when a session opens
+them, so prefetching never evicts entries other sessions are using. A new
+state cancels the work still queued for the previous one.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from demographics.data_access import get_source, prefetch_rows
+from demographics.selection import HOUSING_VALUES
+from demographics.store import CATEGORIES, UNIT_TYPES
+
+PREFETCH_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool shared by every Prefetcher, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="dm-prefetch")
+        return _executor
+
+
+class Prefetcher:
+    """Prefetch handle for one session; keep it in st.session_state."""
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.state = None
+        self._generation = 0
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def prefetch_selection(self, state, category, unit_type, structure_type, tenure, bedrooms,
+                           value=None):
+        """Prefetch the selection on the five sibling tables of a new `state`.
+
+        `value` is the VALUE_TENURE band, None for every band. Calling again
+        for the same state does nothing, whatever else changed; a new state
+        cancels what is still queued for the previous one.
+        """
+        with self._lock:
+            if state.upper() == self.state:
+                return
+            self._cancel()
+            self.state = state.upper()
+            generation = self._generation
+
+        source = get_source()
+        tasks = []
+        for sibling_category in CATEGORIES:
+            for sibling_unit in UNIT_TYPES:
+                if (sibling_category, sibling_unit) == (category, unit_type):
+                    continue
+                if not source.has(sibling_category, state, sibling_unit):
+                    continue
+                # Value bands differ between housing ages; the sidebar falls
+                # back to "All Values" when the band does not exist
+                sibling_value = value if value in HOUSING_VALUES[sibling_unit] else None
+                tasks.append(self._loader(
+                    sibling_category, state, sibling_unit, structure_type, tenure, bedrooms,
+                    sibling_value,
+                ))
+
+        executor = self.executor or get_executor()
+        futures = [executor.submit(self._run, generation, task) for task in tasks]
+        with self._lock:
+            if generation == self._generation:
+                self._futures = futures
+
+    def cancel(self):
+        """Drop the queued work of the current state."""
+        with self._lock:
+            self._cancel()
+            self.state = None
+
+    def pending(self):
+        with self._lock:
+            return sum(not future.done() for future in self._futures)
+
+    def _cancel(self):
+        self._generation += 1
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def _run(self, generation, task):
+        # Tasks that already started are not interrupted, but queued ones of
+        # an outdated state skip their work
+        if generation != self._generation:
+            return None
+        return task()
+
+    @staticmethod
+    def _loader(category, state, unit_type, structure_type, tenure, bedrooms, value):
+        def load():
+            prefetch_rows(category, state, unit_type, structure_type, tenure, bedrooms, value)
+        return load
@@ -0,0 +1,100 @@
+"""Batch demographic projections for whole development programs.
+
+A program is a table with one line per unit type of a project:
+
+    project  state      unit_type  structure_type          tenure    bedrooms  value       units
+    Elm St   NEW JERSEY ALLunits   Single-Family Detached  Own/Rent  3 BR      All Values  120
+    Elm St   NEW JERSEY ALLunits   50+ Units               Rent      2 BR      All Values  300
+
+`project` joins every line against the pop, sac and psc multiplier tables in
+one vectorized merge per category and returns residents, school age children
+(SAC) and public school children (PSC) totals per project, with the age and
+grade-group breakdowns and Low/High bounds. Housing columns accept the
+app's own labels as well (see selection.housing_label), such as Studio-1BR
+or a count of bedrooms.
+"""
+import numpy as np
+import pandas as pd
+
+from demographics.data_access import load_frame
+from demographics.selection import housing_label
+
+# Low/High in the DM tables are the estimate -/+ 1.645 standard errors (90%)
+Z_90 = 1.645
+
+KEY_COLUMNS = ["state", "unit_type", "structure_type", "tenure", "bedrooms", "value"]
+
+# Headline multiplier and its breakdown for each category
+PROJECTED = {
+    "pop": ("PERSONS", ["0-4", "5-17", "18-34", "35-44", "45-54", "55-64", "65-74", "75+"]),
+    "sac": ("SAC", ["(K-5)", "(6-8)", "(9-12)"]),
+    "psc": ("PSC", ["(K-5)", "(6-8)", "(9-12)"]),
+}
+
+
+def _housing_labels(values, column):
+    """Return `values` as the tables spell them; empty values stay empty."""
+    codes, uniques = pd.factorize(values)
+    labels = [housing_label(column, value) for value in uniques]
+    # Code -1 (empty) picks the trailing None
+    return np.array(labels + [None], dtype=object)[codes]
+
+
+def _program_lines(programs, project_column):
+    lines = pd.DataFrame({
+        "project": programs[project_column] if project_column in programs else programs.index,
+        "state": programs["state"].str.strip().str.upper(),
+        "unit_type": programs["unit_type"],
+        "structure_type": programs["structure_type"],
+        "tenure": programs["tenure"],
+        "bedrooms": programs["bedrooms"],
+        "value": programs["value"] if "value" in programs else "All Values",
+        "units": pd.to_numeric(programs["units"]).astype(np.float64),
+    })
+    lines["value"] = lines["value"].fillna("All Values")
+    for column in KEY_COLUMNS[1:]:
+        lines[column] = _housing_labels(lines[column], column)
+    return lines.reset_index(drop=True)
+
+
+def _multipliers(category):
+    headline, breakdown = PROJECTED[category]
+    table = load_frame(category)
+    return table[KEY_COLUMNS[:-1] + ["VALUE_TENURE", headline] + breakdown + ["Standard Errors"]].rename(
+        columns={"VALUE_TENURE": "value"}
+    )
+
+
+def project(programs, project_column="project"):
+    """Return projected totals per project.
+
+    `programs` needs the KEY_COLUMNS (value defaults to "All Values") and a
+    `units` count. Lines without a matching multiplier row contribute
+    nothing and are counted in "Unmatched Units". Bounds assume the rows'
+    sampling errors are independent.
+    """
+    lines = _program_lines(programs, project_column)
+    totals = {"Units": lines["units"]}
+    unmatched = np.zeros(len(lines), dtype=bool)
+
+    for category, (headline, breakdown) in PROJECTED.items():
+        merged = lines.merge(_multipliers(category), how="left", on=KEY_COLUMNS, validate="many_to_one")
+        unmatched |= merged[headline].isna().to_numpy()
+        units = merged["units"]
+        totals[headline] = merged[headline] * units
+        # Variances of independent rows add; missing errors count as zero
+        totals[f"{headline} Variance"] = (merged["Standard Errors"].fillna(0) * units) ** 2
+        for column in breakdown:
+            name = column if category == "pop" else f"{headline} {column}"
+            totals[name] = merged[column] * units
+
+    totals["Unmatched Units"] = lines["units"].where(unmatched, 0.0)
+    summed = pd.DataFrame(totals).groupby(lines["project"], sort=False).sum(min_count=1)
+
+    for headline, _ in PROJECTED.values():
+        error = np.sqrt(summed.pop(f"{headline} Variance"))
+        position = summed.columns.get_loc(headline) + 1
+        summed.insert(position, f"{headline} Low", summed[headline] - Z_90 * error)
+        summed.insert(position + 1, f"{headline} High", summed[headline] + Z_90 * error)
+    summed.index.name = project_column
+    return summed
@@ -0,0 +1,174 @@
+"""Household-weighted multipliers for groups of states.
+
+A rollup combines the states' tables row by row (same housing age,
+structure, tenure, size and value band). Every multiplier is the average of
+the states' values weighted by their Number of Households, and the standard
+error is pooled the same way, treating the state estimates as independent:
+
+    M  = sum(h_s * m_s) / sum(h_s)
+    SE = sqrt(sum(h_s**2 * se_s**2)) / sum(h_s)
+
+Low, High and Error Margin as % are derived from M and SE as in the DM
+tables (90%, 1.645 standard errors); Number of Households is the group's
+total. States without a value, or without households, for a row are left
+out of that row, and a "States" column counts the states that contributed.
+Value bands are state-specific dollar ranges, so value_range is empty.
+
+The nation and the Census Bureau's regions and divisions are precomputed
+per category on first use and cached (`preset_rollups`); any other group is
+one vectorized group-by over the all-states table (`rollup`).
+"""
+import numpy as np
+
+from demographics.data_access import load_frame, memoize
+from demographics.projection import Z_90
+from demographics.store import LABEL_COLUMNS, MEASURES, PARSED_COLUMNS, STATE_ALIASES, read_only_frame
+
+# Census Bureau divisions, grouped into their regions
+DIVISIONS = {
+    "New England Division": ["Connecticut", "Maine", "Massachusetts", "New Hampshire", "Rhode Island", "Vermont"],
+    "Middle Atlantic Division": ["New Jersey", "New York", "Pennsylvania"],
+    "East North Central Division": ["Illinois", "Indiana", "Michigan", "Ohio", "Wisconsin"],
+    "West North Central Division": ["Iowa", "Kansas", "Minnesota", "Missouri", "Nebraska", "North Dakota", "South Dakota"],
+    "South Atlantic Division": [
+        "Delaware", "Washington D.C.", "Florida", "Georgia", "Maryland", "North Carolina", "South Carolina",
+        "Virginia", "West Virginia",
+    ],
+    "East South Central Division": ["Alabama", "Kentucky", "Mississippi", "Tennessee"],
+    "West South Central Division": ["Arkansas", "Louisiana", "Oklahoma", "Texas"],
+    "Mountain Division": ["Arizona", "Colorado", "Idaho", "Montana", "Nevada", "New Mexico", "Utah", "Wyoming"],
+    "Pacific Division": ["Alaska", "California", "Hawaii", "Oregon", "Washington"],
+}
+REGIONS = {
+    "Northeast Region": ["New England Division", "Middle Atlantic Division"],
+    "Midwest Region": ["East North Central Division", "West North Central Division"],
+    "South Region": ["South Atlantic Division", "East South Central Division", "West South Central Division"],
+    "West Region": ["Mountain Division", "Pacific Division"],
+}
+NATIONAL = "United States"
+# Rollup name -> member states; the nation is the 50 states and D.C.
+PRESETS = {NATIONAL: sorted(state for states in DIVISIONS.values() for state in states)}
+PRESETS.update(
+    (region, sorted(state for division in divisions for state in DIVISIONS[division]))
+    for region, divisions in REGIONS.items()
+)
+PRESETS.update(DIVISIONS)
+
+# Table rows are matched across states on these columns
+ROW_KEY = ["unit_type", "Structure", "VALUE_TENURE"]
+HOUSEHOLDS = "Number of Households"
+ERRORS = "Standard Errors"
+HEADLINE = {"pop": "PERSONS", "sac": "SAC", "psc": "PSC"}
+
+
+def preset_name(name):
+    """Return the preset rollup called `name` in any case, or None."""
+    for preset in PRESETS:
+        if preset.upper() == name.upper():
+            return preset
+    return None
+
+
+def _table_state(state):
+    state = state.upper()
+    return STATE_ALIASES.get(state, state)
+
+
+def _row_groups(category):
+    """Return (row keys frame, group of every all-states row), cached per store."""
+    def build():
+        frame = load_frame(category)
+        groups = frame.groupby(ROW_KEY, sort=False).ngroup().to_numpy()
+        first = np.unique(groups, return_index=True)[1]
+        keys = frame.iloc[first][ROW_KEY + PARSED_COLUMNS].reset_index(drop=True)
+        return keys, groups
+
+    return memoize(("rollup_groups", category), build)
+
+
+def rollup(states, category):
+    """Return the household-weighted table of `category` for a group of states.
+
+    The result has the columns of the all-states table except state, with
+    one row per (housing age, Structure, value band), plus States.
+    """
+    frame = load_frame(category)
+    keys, groups = _row_groups(category)
+    members = {_table_state(state) for state in states}
+    unknown = members - set(frame["state"].unique())
+    if unknown:
+        raise KeyError(f"No data for {', '.join(sorted(unknown))}")
+
+    households = frame[HOUSEHOLDS].to_numpy(dtype=np.float64)
+    weights = np.where(frame["state"].isin(members) & (households > 0), households, 0.0)
+    count = len(keys)
+
+    data = {column: keys[column].to_numpy(dtype=object) for column in ["unit_type", "Structure", "VALUE_TENURE"]}
+    data["value_range"] = np.full(count, np.nan, dtype=object)
+    for column in PARSED_COLUMNS:
+        data[column] = keys[column].to_numpy(dtype=object)
+
+    headline = HEADLINE[category]
+    for column in MEASURES[category]:
+        if column in (HOUSEHOLDS, ERRORS, "Low", "High", "Error Margin as %"):
+            continue
+        values = frame[column].to_numpy(dtype=np.float64)
+        used = np.where(np.isnan(values), 0.0, weights)
+        total = np.bincount(groups, weights=used, minlength=count)
+        weighted = np.bincount(groups, weights=used * np.nan_to_num(values), minlength=count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            data[column] = weighted / total
+        if column == headline:
+            # A state with a headline value but no standard error leaves the
+            # pooled error unknown rather than understated
+            errors = frame[ERRORS].to_numpy(dtype=np.float64)
+            variance = np.bincount(groups, weights=np.where(used > 0, used ** 2 * errors ** 2, 0.0),
+                                   minlength=count)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                error = np.sqrt(variance) / total
+            states = np.bincount(groups, weights=used > 0, minlength=count)
+            households_total = total
+
+    estimate = data[headline]
+    data[HOUSEHOLDS] = households_total
+    data[ERRORS] = error
+    data["Low"] = estimate - Z_90 * error
+    data["High"] = estimate + Z_90 * error
+    with np.errstate(invalid="ignore", divide="ignore"):
+        data["Error Margin as %"] = Z_90 * error / estimate
+    data["States"] = states.astype(np.int64)
+    # Same column order as the all-states table
+    order = ["unit_type"] + LABEL_COLUMNS + PARSED_COLUMNS + MEASURES[category] + ["States"]
+    return read_only_frame({column: np.asarray(data[column]) for column in order})
+
+
+def preset_rollups(category):
+    """Return {preset name: rollup} for the nation, regions and divisions."""
+    return memoize(
+        ("preset_rollups", category),
+        lambda: {name: rollup(states, category) for name, states in PRESETS.items()},
+    )
+
+
+def select_rollup(name, category, unit_type, structure_type, tenure, bedrooms, value=None, states=None):
+    """Return the rollup rows of one sidebar selection, like data_access.select_rows.
+
+    `name` is a preset; for any other name `states` gives the members.
+    `value` None keeps every value band.
+    """
+    preset = preset_name(name)
+    if preset is not None:
+        table = preset_rollups(category)[preset]
+    elif states:
+        table = rollup(states, category)
+    else:
+        raise KeyError(f"Unknown region: {name}")
+    mask = (
+        (table["unit_type"] == unit_type)
+        & (table["structure_type"] == structure_type)
+        & (table["tenure"] == tenure)
+        & (table["bedrooms"] == bedrooms)
+    )
+    if value is not None:
+        mask &= table["VALUE_TENURE"] == value
+    return table[mask].drop(columns=["unit_type"] + PARSED_COLUMNS).reset_index(drop=True)
@@ -0,0 +1,187 @@
+"""Selection vocabulary and rules shared by the apps, the CLI and services.
+
+Nothing here imports Streamlit, and pandas is only loaded by `query`, so
+scripts can resolve a selection without paying for the UI stack.
+"""
+from demographics.store import LABEL_COLUMNS, STATISTICS
+
+# States offered by the apps, one name per state; the store also has other
+# spellings of some of them (see DMStore.aliases and the DC tables)
+STATE_NAMES = [
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "Florida", "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas", "Kentucky",
+    "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota", "Mississippi",
+    "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey", "New Mexico",
+    "New York", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania",
+    "Puerto Rico", "Rhode Island", "South Carolina", "South Dakota", "Tennessee", "Texas", "Utah",
+    "Vermont", "Virginia", "Washington", "Washington D.C.", "West Virginia", "Wisconsin", "Wyoming",
+]
+
+# Housing age choices shown in the sidebar -> DM file unit type
+UNIT_TYPES = {
+    "All (All Age) Housing - Built in any year": "ALLunits",
+    "Newer (Newer Built) Housing - Built 2000-2021": "NEWERunits",
+}
+
+# Demographic data category shown in the sidebar -> DM file category
+CATEGORY_LABELS = {
+    "Household Size": "pop",
+    "Household Size Statistics": "pop",
+    "Persons by Age": "pop",
+    "Total School Age Children": "sac",
+    "School Age Children by school level and grade group": "sac",
+    "School Age Children Statistics": "sac",
+    "Total Public School Children": "psc",
+    "Public School Children by school level and grade group": "psc",
+    "Public School Children Statistics": "psc",
+}
+
+# Combined structure and tenure choices -> (structure type, tenure) in the tables
+STRUCTURE_TENURE_MAP = {
+    "Single-Family Detached (Combines Own and Rent tenure)": ("Single-Family Detached", "Own/Rent"),
+    "Single-Family Attached (Combines Own and Rent tenure)": ("Single-Family Attached", "Own/Rent"),
+    "Smaller (2-4 unit) Multifamily (Combines Own and Rent tenure)": ("2-4 Units", "Own/Rent"),
+    "Midsize (5-49 units) Multifamily (Own tenure alone)": ("5-49 Units", "Own"),
+    "Midsize (5-49 units) Multifamily (Rent tenure alone)": ("5-49 Units", "Rent"),
+    "Larger (50 or more units) Multifamily (Own tenure alone)": ("50+ Units", "Own"),
+    "Larger (50 or more units) Multifamily (Rent tenure alone)": ("50+ Units", "Rent"),
+    "All Housing (all above housing types) (Own tenure alone)": ("All Housing Types", "Own"),
+    "All Housing (all above housing types) (Rent tenure alone)": ("All Housing Types", "Rent"),
+}
+COMBINED_OPTIONS = list(STRUCTURE_TENURE_MAP)
+
+# Bedroom sizes published for each structure type
+BR_SIZES = {
+    "Single-Family Detached": ["2 BR", "3 BR", "4-5 BR"],
+    "Single-Family Attached": ["2 BR", "3 BR"],
+    "2-4 Units": ["0-1 BR", "2 BR", "3 BR"],
+    "5-49 Units": ["0-1 BR", "2 BR", "3 BR"],
+    "50+ Units": ["0-1 BR", "2 BR", "3 BR"],
+    "All Housing Types": ["0-1 BR", "2 BR", "3 BR", "4-5 BR"],
+}
+# The sidebar shows the 0-1 BR size as Studio-1BR
+SIZE_DISPLAY = {"0-1 BR": "Studio-1BR"}
+BEDROOM_LABELS = sorted({size for sizes in BR_SIZES.values() for size in sizes})
+
+# Housing value bands for each unit type
+HOUSING_VALUES = {
+    "ALLunits": ["All Values", "First Tercile", "Second Tercile", "Third Tercile"],
+    "NEWERunits": ["All Values", "Below Median", "Above Median"],
+}
+
+LIST_COLUMNS = LABEL_COLUMNS
+# Columns shown for each demographic data category
+LABELS_SELECTED = {
+    "Household Size": LIST_COLUMNS + ["PERSONS"],
+    "Household Size Statistics": LIST_COLUMNS + STATISTICS,
+    "Persons by Age": LIST_COLUMNS + ["0-4", "5-17", "18-34", "35-44", "45-54", "55-64", "65-74", "75+"],
+    "Total School Age Children": LIST_COLUMNS + ["SAC"],
+    "School Age Children by school level and grade group": LIST_COLUMNS + ["(K-5)", "(6-8)", "(9-12)"],
+    "School Age Children Statistics": LIST_COLUMNS + STATISTICS[1:],
+    "Total Public School Children": LIST_COLUMNS + ["PSC"],
+    "Public School Children by school level and grade group": LIST_COLUMNS + ["(K-5)", "(6-8)", "(9-12)"],
+    "Public School Children Statistics": LIST_COLUMNS + STATISTICS[1:],
+}
+
+
+def bedroom_options(combined_option):
+    """Return the sidebar size choices for a structure and tenure option."""
+    structure_type, _ = STRUCTURE_TENURE_MAP[combined_option]
+    return [SIZE_DISPLAY.get(size, size) for size in BR_SIZES[structure_type]]
+
+
+def bedroom_size(size):
+    """Map a sidebar size choice back to the tables' bedrooms label."""
+    for table_size, display_size in SIZE_DISPLAY.items():
+        if size == display_size:
+            return table_size
+    return size
+
+
+def unit_type_code(unit_type):
+    """Accept a sidebar housing age label or a unit type in any case."""
+    if unit_type in UNIT_TYPES:
+        return UNIT_TYPES[unit_type]
+    for code in HOUSING_VALUES:
+        if unit_type.upper() == code.upper():
+            return code
+    raise KeyError(f"Unknown housing age: {unit_type}")
+
+
+def bedroom_label(size):
+    """Return the tables' bedrooms label for a count, such as 3 or "3", or a size label."""
+    try:
+        count = float(size)
+    except ValueError:
+        return bedroom_size(size)
+    for label in BEDROOM_LABELS:
+        low, _, high = label.split()[0].partition("-")
+        if int(low) <= count <= int(high or low):
+            return label
+    return size
+
+
+def housing_label(column, value):
+    """Return a value of a program or site housing column as the tables spell it.
+
+    Padding is stripped, unit types are accepted in any case or as sidebar
+    housing age labels, and bedrooms as counts or sidebar sizes. Values
+    outside the vocabulary come back stripped, so they match no row.
+    """
+    value = str(value).strip()
+    if column == "unit_type":
+        try:
+            return unit_type_code(value)
+        except KeyError:
+            return value
+    if column == "bedrooms":
+        return bedroom_label(value)
+    return value
+
+
+def resolve_table(category_label, state, unit_type):
+    """Return the (category, STATE, unit type) partition of a selection."""
+    return CATEGORY_LABELS[category_label], state.upper(), unit_type_code(unit_type)
+
+
+def dm_file_name(category_label, state, unit_type):
+    """Return the DM csv a selection was originally published in."""
+    category, state, unit_type = resolve_table(category_label, state, unit_type)
+    return f"DM_{category}_{state}_{unit_type}.csv"
+
+
+def _selection_args(state, unit_type, combined_option, size, value, category_label):
+    if category_label not in CATEGORY_LABELS:
+        raise KeyError(f"Unknown category: {category_label}")
+    if combined_option not in STRUCTURE_TENURE_MAP:
+        raise KeyError(f"Unknown structure and tenure option: {combined_option}")
+    category, state, unit_type = resolve_table(category_label, state, unit_type)
+    structure_type, tenure = STRUCTURE_TENURE_MAP[combined_option]
+    return (
+        category, state, unit_type, structure_type, tenure, bedroom_size(size),
+        None if value == "All Values" else value,
+    )
+
+
+def query(state, unit_type, combined_option, size, value="All Values",
+          category_label="Household Size"):
+    """Return the table rows for one sidebar selection.
+
+    "All Values" keeps every value band of the structure, as the app does.
+    """
+    from demographics.data_access import select_rows
+
+    args = _selection_args(state, unit_type, combined_option, size, value, category_label)
+    return select_rows(*args)[LABELS_SELECTED[category_label]]
+
+
+def query_records(state, unit_type, combined_option, size, value="All Values",
+                  category_label="Household Size"):
+    """Like `query`, but return (columns, rows of tuples) without pandas."""
+    from demographics.data_access import get_store
+
+    args = _selection_args(state, unit_type, combined_option, size, value, category_label)
+    store = get_store()
+    store.rows(*args[:3])
+    columns = LABELS_SELECTED[category_label]
+    return columns, store.records(args[0], store.lookup(*args), columns)
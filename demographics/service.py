@@ -0,0 +1,171 @@
+"""Standalone JSON service for the demographic multipliers.
+
+    python -m demographics serve --port 8502
+
+    GET  /multipliers?state=New Jersey&unit=ALLunits&category=Household Size
+                     &structure=Single-Family Detached (Combines Own and Rent tenure)
+                     &size=3 BR&value=All Values
+    POST /multipliers   {"queries": [{"state": ..., "structure": ..., ...}, ...]}
+    GET  /health
+
+Parameters use the app's vocabulary (see demographics.selection): `category`
+is a category label, `structure` a combined structure and tenure option and
+`value` a housing value band. Every table and index is loaded at startup, so
+requests only do dictionary lookups; GET responses are cached with an ETag.
+"""
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from demographics import selection
+from demographics.data_access import LRUCache, _mtime, get_store
+from demographics.store import STORE_DIR
+
+RESPONSE_CACHE_SIZE = 4096
+MAX_BULK_QUERIES = 10000
+MAX_BODY_BYTES = 16 * 1024 * 1024
+INDEX_PATH = os.path.join(STORE_DIR, "index.json")
+
+# Query parameter -> selection.query_records argument and default
+PARAMETERS = {
+    "state": ("state", None),
+    "unit": ("unit_type", "ALLunits"),
+    "structure": ("combined_option", None),
+    "size": ("size", None),
+    "value": ("value", "All Values"),
+    "category": ("category_label", "Household Size"),
+}
+
+
+def preload():
+    """Load the store and index every table up front."""
+    store = get_store()
+    store.build_index()
+    return store
+
+
+def run_query(params):
+    """Answer one query given as a dict of PARAMETERS."""
+    unknown = set(params) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameter: {sorted(unknown)[0]}")
+    arguments = {}
+    for name, (argument, default) in PARAMETERS.items():
+        value = params.get(name, default)
+        if value is None:
+            raise ValueError(f"Missing parameter: {name}")
+        arguments[argument] = value
+    try:
+        columns, rows = selection.query_records(**arguments)
+    except KeyError as error:
+        raise ValueError(error.args[0]) from None
+    return {"rows": [dict(zip(columns, row)) for row in rows]}
+
+
+class MultiplierHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections; every response sets Content-Length
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without TCP_NODELAY each response
+    # waits on the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send(200, b'{"status": "ok"}')
+        elif url.path == "/multipliers":
+            params = dict(parse_qsl(url.query))
+            # Keyed by the store's mtime, like data_access, so a rebuilt
+            # store gets new bodies and ETags
+            key = ("GET", _mtime(INDEX_PATH), tuple(sorted(params.items())))
+            status, body, etag = self.response_cache.get_or_load(key, lambda: self._answer(params))
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", etag)
+            else:
+                self._send(status, body, etag)
+        else:
+            self._send(404, b'{"error": "Not found"}')
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/multipliers":
+            # Errors before the body is read leave it on the socket, so the
+            # connection cannot be reused
+            self.close_connection = True
+            self._send(404, b'{"error": "Not found"}')
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if not 0 <= length <= MAX_BODY_BYTES:
+                raise ValueError(f"Content-Length must be between 0 and {MAX_BODY_BYTES}")
+        except ValueError as error:
+            self.close_connection = True
+            self._send(400, json.dumps({"error": f"Bad request body: {error}"}).encode())
+            return
+        try:
+            queries = json.loads(self.rfile.read(length))["queries"]
+            if len(queries) > MAX_BULK_QUERIES:
+                raise ValueError(f"At most {MAX_BULK_QUERIES} queries per request")
+        except (ValueError, KeyError, TypeError) as error:
+            self._send(400, json.dumps({"error": f"Bad request body: {error}"}).encode())
+            return
+        results = []
+        for params in queries:
+            try:
+                results.append(run_query(params))
+            except (ValueError, TypeError, AttributeError) as error:
+                results.append({"error": str(error)})
+        self._send(200, json.dumps({"results": results}).encode())
+
+    def _answer(self, params):
+        try:
+            status, body = 200, json.dumps(run_query(params)).encode()
+        except ValueError as error:
+            status, body = 400, json.dumps({"error": str(error)}).encode()
+        return status, body, '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "max-age=300")
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Per-request logging to stderr costs more than answering the request
+        pass
+
+
+def make_server(host="127.0.0.1", port=8502):
+    preload()
+    server = ThreadingHTTPServer((host, port), MultiplierHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host="127.0.0.1", port=8502):
+    server = make_server(host, port)
+    print(f"Serving demographic multipliers on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve_in_thread(host="127.0.0.1", port=0):
+    """Start a server on a background thread; returns it (for tests and load tests)."""
+    server = make_server(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,238 @@
+"""Monte Carlo confidence intervals for projected totals.
+
+`simulate` takes the same program table as `projection.project` and draws
+every matched multiplier from its sampling distribution, a normal with the
+row's Standard Errors, truncated at zero. Draws are made per multiplier row,
+so program lines that use the same row share its sampling error; PERSONS,
+SAC and PSC rows are drawn independently of each other. The age and grade
+group totals follow the drawn headline in the row's published shares.
+
+Only the rows some line uses are drawn. Draws are generated in chunks of at
+most CHUNK_ELEMENTS values, and each chunk is summed per project over that
+project's (project, row) pairs, so the work grows with the number of lines
+rather than with rows times projects. The totals only update a running sum
+and a fixed histogram per total, spanning HISTOGRAM_WIDTH standard
+deviations around its expected value in up to HISTOGRAM_BINS bins, so
+memory does not grow with the number of draws. Percentiles are interpolated
+within their bin, well below the Monte Carlo error.
+"""
+import numpy as np
+import pandas as pd
+
+from demographics.projection import KEY_COLUMNS, PROJECTED, _multipliers, _program_lines
+
+DEFAULT_DRAWS = 100_000
+DEFAULT_PERCENTILES = (5, 50, 95)
+# Upper bound on the random numbers, and on the totals, of one chunk of draws
+CHUNK_ELEMENTS = 1_000_000
+HISTOGRAM_BINS = 8192
+MIN_HISTOGRAM_BINS = 256
+# Upper bound on the histograms of one category, unless MIN_HISTOGRAM_BINS needs more
+HISTOGRAM_BYTES = 16 * 2 ** 20
+# Projects with more (project, row) pairs than this are summed with np.add.reduceat
+SMALL_PROJECT = 16
+# Histogram range in standard deviations either side of the expected total
+HISTOGRAM_WIDTH = 8.0
+
+
+class _Category:
+    """The matched multiplier rows of one category and the units on them.
+
+    Lines are reduced to one pair per (project, row) holding its units, and
+    every total is a sum over a project's pairs. Projects with more than
+    SMALL_PROJECT pairs are summed with np.add.reduceat; the others, usually
+    most, are summed position by position, which is faster for short runs.
+    """
+
+    def __init__(self, lines, category, projects):
+        headline, breakdown = PROJECTED[category]
+        self.names = [headline] + [column if category == "pop" else f"{headline} {column}" for column in breakdown]
+        merged = lines.merge(_multipliers(category), how="left", on=KEY_COLUMNS, validate="many_to_one")
+        self.unmatched = merged[headline].isna().to_numpy()
+        merged = merged[~self.unmatched]
+        # Positions in `projects` of the projects with a matched line, in
+        # the order `totals` lists them
+        self.projects = np.zeros(0, dtype=np.int64)
+        if merged.empty:
+            return
+        rows, row_index = np.unique(
+            merged[KEY_COLUMNS].to_numpy(dtype=str), axis=0, return_inverse=True
+        )
+        row_index = row_index.ravel()
+        # Any line of a row carries the row's multipliers
+        first = np.zeros(len(rows), dtype=np.int64)
+        first[row_index] = np.arange(len(merged))
+
+        self.estimates = merged[headline].to_numpy(dtype=np.float64)[first]
+        self.errors = merged["Standard Errors"].fillna(0).to_numpy(dtype=np.float64)[first]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = [
+                np.nan_to_num(merged[column].to_numpy(dtype=np.float64)[first] / self.estimates)
+                for column in breakdown
+            ]
+
+        pairs, pair_index = np.unique(
+            projects.get_indexer(merged["project"]) * len(rows) + row_index, return_inverse=True
+        )
+        units = np.bincount(pair_index.ravel(), weights=merged["units"].to_numpy(), minlength=len(pairs))
+        pair_projects, pair_rows = np.divmod(pairs, len(rows))
+        matched, starts, sizes = np.unique(pair_projects, return_index=True, return_counts=True)
+
+        # Pairs of large projects come first, project by project, then those
+        # of small projects by decreasing size, position by position, so
+        # that the projects with a k-th pair are a prefix of them
+        large = sizes > SMALL_PROJECT
+        small = np.flatnonzero(~large)
+        small = small[np.argsort(-sizes[small], kind="stable")]
+        self._counts = [int((sizes[small] > position).sum()) for position in range(sizes[small].max(initial=0))]
+        order = np.concatenate(
+            [np.flatnonzero(np.repeat(large, sizes))]
+            + [starts[small[:count]] + position for position, count in enumerate(self._counts)]
+        )
+        self._large_starts = np.cumsum(sizes[large]) - sizes[large]
+        self._split = int(sizes[large].sum())
+        self.projects = matched[np.concatenate([np.flatnonzero(large), small])]
+        self.rows = pair_rows[order]
+        units = units[order]
+        # weights[total, pair]: the pair's units, scaled by the row's share for breakdown totals
+        self.weights = np.array([units] + [units * share[self.rows] for share in shares])
+        self._weights = self.weights.astype(np.float32)
+
+    def _sum_pairs(self, values):
+        """Sum (pairs, draws) values to (projects, draws)."""
+        sums = []
+        if self._split:
+            sums.append(np.add.reduceat(values[:self._split], self._large_starts))
+        if self._counts:
+            small = values[self._split:]
+            total = small[:self._counts[0]].copy()
+            offset = self._counts[0]
+            for count in self._counts[1:]:
+                total[:count] += small[offset:offset + count]
+                offset += count
+            sums.append(total)
+        return np.concatenate(sums)
+
+    def expected(self):
+        """Return the expected value and standard deviation of every total.
+
+        Both are laid out total by total, project by project, as `totals` is.
+        """
+        center = [self._sum_pairs((weight * self.estimates[self.rows])[:, None]) for weight in self.weights]
+        variance = [self._sum_pairs((weight * self.errors[self.rows])[:, None] ** 2) for weight in self.weights]
+        return np.concatenate(center).ravel(), np.sqrt(np.concatenate(variance).ravel())
+
+    def totals(self, sample):
+        """Return the (totals, draws) totals of a (rows, draws) float32 sample."""
+        values = sample[self.rows]
+        return np.concatenate([self._sum_pairs(values * weight[:, None]) for weight in self._weights])
+
+
+class _Histograms:
+    """Running sum and fixed-range histogram of each column of the totals.
+
+    Columns get HISTOGRAM_BINS bins, or fewer when that would take more than
+    HISTOGRAM_BYTES, but never fewer than MIN_HISTOGRAM_BINS.
+    """
+
+    def __init__(self, center, spread):
+        self.bins = int(np.clip(HISTOGRAM_BYTES // (4 * len(center)), MIN_HISTOGRAM_BINS, HISTOGRAM_BINS))
+        self.low = center - HISTOGRAM_WIDTH * spread
+        # Constant totals still get a (tiny) nonzero bin width
+        self.width = np.maximum(2 * HISTOGRAM_WIDTH * spread / self.bins, 1e-9 * np.maximum(1, np.abs(center)))
+        # int32 counts hold up to 2**31 draws
+        self.counts = np.zeros(len(center) * self.bins, dtype=np.int32)
+        self.sums = np.zeros(len(center))
+        self.draws = 0
+        self._low = self.low.astype(np.float32)
+        self._scale = (1 / self.width).astype(np.float32)
+        # Columns counted per bincount, so that its result stays small
+        self._block = max(1, CHUNK_ELEMENTS // self.bins)
+        self._offsets = np.arange(self._block) * self.bins
+
+    def add(self, totals):
+        """Count a (totals, draws) float32 chunk; the chunk is overwritten.
+
+        Each call costs about as much as the whole histogram, so chunks
+        should have at least `bins` draws.
+        """
+        self.sums += totals.sum(axis=1, dtype=np.float64)
+        self.draws += totals.shape[1]
+        totals -= self._low[:, None]
+        totals *= self._scale[:, None]
+        # Totals outside the range are counted in the edge bins
+        np.clip(totals, 0, self.bins - 1, out=totals)
+        index = totals.astype(np.intp)
+        for start in range(0, len(index), self._block):
+            block = index[start:start + self._block]
+            block += self._offsets[:len(block), None]
+            size = len(block) * self.bins
+            self.counts[start * self.bins:start * self.bins + size] += np.bincount(block.ravel(), minlength=size)
+
+    def percentiles(self, percentiles):
+        counts = self.counts.reshape(-1, self.bins)
+        cumulative = counts.cumsum(axis=1, dtype=np.int64)
+        values = np.empty((len(percentiles), len(counts)))
+        for position, percentile in enumerate(percentiles):
+            target = percentile / 100 * self.draws
+            bins = np.minimum((cumulative < target).sum(axis=1), self.bins - 1)
+            columns = np.arange(len(counts))
+            before = np.where(bins > 0, cumulative[columns, bins - 1], 0)
+            within = counts[columns, bins]
+            fraction = np.where(within > 0, (target - before) / np.maximum(within, 1), 0.5)
+            values[position] = self.low + (bins + np.clip(fraction, 0, 1)) * self.width
+        return values
+
+
+def simulate(programs, draws=DEFAULT_DRAWS, seed=0, percentiles=DEFAULT_PERCENTILES,
+             project_column="project"):
+    """Return the mean and percentiles of every projected total, per project.
+
+    The result has one row per (project, total), where the totals are the
+    same as `project` computes (PERSONS, the age groups, SAC, PSC and their
+    grade groups). It has a Mean column, a P{n} column per percentile and
+    the project's "Unmatched Units", as `project` counts them. Totals of a
+    project with no matched line in their category are NaN. The same seed
+    gives the same result.
+    """
+    lines = _program_lines(programs, project_column)
+    projects = pd.Index(lines["project"].unique())
+    rng = np.random.default_rng(seed)
+    unmatched = np.zeros(len(lines), dtype=bool)
+
+    names = []
+    # Mean and percentiles of every (project, total), project by project
+    values = []
+    for category in PROJECTED:
+        inputs = _Category(lines, category, projects)
+        unmatched |= inputs.unmatched
+        names += inputs.names
+        result = np.full((1 + len(percentiles), len(projects), len(inputs.names)), np.nan)
+        values.append(result)
+        if not len(inputs.projects):
+            continue
+        histograms = _Histograms(*inputs.expected())
+        estimates = inputs.estimates.astype(np.float32)
+        errors = inputs.errors.astype(np.float32)
+        width = max(len(estimates), len(inputs.rows), len(histograms.sums))
+        chunk = max(CHUNK_ELEMENTS // width, histograms.bins)
+        for start in range(0, draws, chunk):
+            sample = rng.standard_normal((len(estimates), min(chunk, draws - start)), dtype=np.float32)
+            sample *= errors[:, None]
+            sample += estimates[:, None]
+            np.maximum(sample, 0, out=sample)
+            histograms.add(inputs.totals(sample))
+        # The histograms' columns run total by total, project by project
+        found = np.vstack([histograms.sums / draws, histograms.percentiles(percentiles)])
+        result[:, inputs.projects] = found.reshape(len(found), len(inputs.names), -1).transpose(0, 2, 1)
+
+    values = np.concatenate(values, axis=2).reshape(1 + len(percentiles), -1)
+    result = pd.DataFrame(
+        {"Mean": values[0]},
+        index=pd.MultiIndex.from_product([projects, names], names=[project_column, "total"]),
+    )
+    for percentile, row in zip(percentiles, values[1:]):
+        result[f"P{percentile:g}"] = row
+    unmatched_units = lines["units"].where(unmatched, 0.0).groupby(lines["project"], sort=False).sum()
+    result["Unmatched Units"] = unmatched_units.reindex(projects).to_numpy().repeat(len(names))
+    return result
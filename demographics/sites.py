@@ -0,0 +1,93 @@
+"""Multipliers for project sites given as coordinates rather than states.
+
+A sites table has a latitude and a longitude column (lat, lon and lng are
+accepted too) and, optionally, the housing columns of a program line:
+
+    site     latitude  longitude  unit_type  structure_type          tenure    bedrooms  value       units
+    Elm St   40.7357   -74.1724   ALLunits   Single-Family Detached  Own/Rent  3 BR      All Values  120
+
+`enrich_sites` locates every site in one batched point-in-polygon pass over
+the state boundaries (see geometry.StateLocator), fills housing columns the
+table lacks from `defaults`, such as the app's sidebar selection, and adds
+the PERSONS, SAC and PSC multipliers, with their Low and High, of each
+site's row. The state column uses the tables' state names, so the result
+can go straight to projection.project. Sites outside every state, or whose
+selection has no row, keep empty multipliers. Housing columns accept the
+app's own labels as well (see selection.housing_label), such as a count of
+bedrooms or a unit type in any case.
+"""
+import numpy as np
+import pandas as pd
+
+from demographics.data_access import load_frame, load_locator
+from demographics.projection import KEY_COLUMNS, PROJECTED, _housing_labels
+from demographics.store import STATE_ALIASES
+
+LATITUDE_COLUMNS = ["latitude", "lat"]
+LONGITUDE_COLUMNS = ["longitude", "lon", "lng"]
+
+
+def _coordinates(sites, names):
+    for column in sites.columns:
+        if str(column).strip().lower() in names:
+            break
+    else:
+        raise KeyError(f"Sites need a {names[0]} column")
+    values = pd.to_numeric(sites[column], errors="coerce")
+    bad = values.isna() & sites[column].notna()
+    if bad.any():
+        row = bad.idxmax()
+        raise ValueError(f"Sites column {column} has a non-numeric value in row {row}: {sites[column][row]!r}")
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def locate_states(latitudes, longitudes):
+    """Return each point's state as named in the tables, or None outside every state."""
+    locator = load_locator()
+    names = [name.upper() for name in locator.names]
+    # The trailing None is what index -1 (no state) picks
+    names = np.array([STATE_ALIASES.get(name, name) for name in names] + [None], dtype=object)
+    return names[locator.locate(latitudes, longitudes)]
+
+
+def _multipliers(category):
+    headline = PROJECTED[category][0]
+    table = load_frame(category)
+    return table[KEY_COLUMNS[:-1] + ["VALUE_TENURE", headline, "Low", "High"]].rename(
+        columns={"VALUE_TENURE": "value", "Low": f"{headline} Low", "High": f"{headline} High"}
+    )
+
+
+def enrich_sites(sites, defaults=None):
+    """Return a copy of `sites` with each site's state and multipliers.
+
+    `defaults` maps housing columns (unit_type, structure_type, tenure,
+    bedrooms, value) to the value used where the table lacks the column or
+    leaves it empty; value defaults to "All Values". The located state
+    replaces any state column of the table. Raises KeyError for a missing
+    column and ValueError for a coordinate that is not a number.
+    """
+    defaults = dict({"value": "All Values"}, **(defaults or {}))
+    latitudes = _coordinates(sites, LATITUDE_COLUMNS)
+    longitudes = _coordinates(sites, LONGITUDE_COLUMNS)
+    enriched = sites.copy()
+    enriched["state"] = locate_states(latitudes, longitudes)
+    for column in KEY_COLUMNS[1:]:
+        if column in enriched and column in defaults:
+            enriched[column] = enriched[column].fillna(defaults[column])
+        elif column not in enriched:
+            if column not in defaults:
+                raise KeyError(f"Sites need a {column} column")
+            enriched[column] = defaults[column]
+        enriched[column] = _housing_labels(enriched[column], column)
+
+    # Sites share few distinct selections: join those once and spread the
+    # multipliers back to the sites
+    groups = enriched.groupby(KEY_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+    first = np.unique(groups, return_index=True)[1]
+    keys = enriched[KEY_COLUMNS].iloc[first].reset_index(drop=True)
+    for category in PROJECTED:
+        joined = keys.merge(_multipliers(category), how="left", on=KEY_COLUMNS, validate="many_to_one")
+        for column in joined.columns[len(KEY_COLUMNS):]:
+            enriched[column] = joined[column].to_numpy()[groups]
+    return enriched
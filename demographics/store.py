@@ -0,0 +1,242 @@
+"""Read access to the columnar DM store.
+
+All DM_{category}_{STATE}_{unit}.csv tables live in one store directory:
+
+    index.json            vocabularies, the (category, state, unit) partitions,
+                          the alias table, the source file checksums and the
+                          names of the arrays below
+    {category}.codes.*.npy     int16 codes, one column per CODE_COLUMNS entry
+    {category}.measures.*.npy  float32 measures, one column per MEASURES entry
+
+Each build writes its arrays under new names and publishes them by
+replacing index.json, so an index is always read with its own arrays.
+
+Besides the raw Structure label, ingest splits it into structure_type,
+tenure and bedrooms columns, so a sidebar selection resolves through a
+dictionary lookup to its row offsets. The arrays are memory-mapped, so
+reading a selection only touches its rows.
+
+Byte-identical csvs are stored once: the alias table maps each duplicate
+partition to the partition owning its rows, and both resolve to the same
+row range.
+
+One DMStore is shared by every session of the app process, so nothing it
+hands out is writable: the arrays are mapped read-only, and vocabularies,
+lookup indexes and the columns of returned DataFrames are read-only arrays.
+Writing into them raises ValueError instead of changing what other
+sessions read.
+"""
+import json
+import os
+
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(DATA_DIR, "dm_store")
+STORE_VERSION = 4
+
+CATEGORIES = ["pop", "sac", "psc"]
+UNIT_TYPES = ["ALLunits", "NEWERunits"]
+LABEL_COLUMNS = ["Structure", "VALUE_TENURE", "value_range"]
+# Parsed from Structure, e.g. "Single-Family Detached  (Own/Rent), 2 BR"
+PARSED_COLUMNS = ["structure_type", "tenure", "bedrooms"]
+CODE_COLUMNS = LABEL_COLUMNS + PARSED_COLUMNS
+STATISTICS = ["Number of Households", "Standard Errors", "Low", "High", "Error Margin as %"]
+MEASURES = {
+    "pop": ["PERSONS", "0-4", "5-17", "18-34", "35-44", "45-54", "55-64", "65-74", "75+"] + STATISTICS,
+    "sac": ["SAC", "(K-5)", "(6-8)", "(9-12)"] + STATISTICS,
+    "psc": ["PSC", "(K-5)", "(6-8)", "(9-12)"] + STATISTICS,
+}
+# Other spellings of a state that has no files under that name
+STATE_ALIASES = {"DISTRICT OF COLUMBIA": "WASHINGTON D.C."}
+
+
+def partition_key(category, state, unit_type):
+    return f"{category}/{state.upper()}/{unit_type}"
+
+
+def read_only_frame(columns, index=None):
+    """Return a DataFrame over the given column arrays without copying them.
+
+    The arrays are made read-only, so in-place writes to the frame, or to a
+    shallow copy of it, raise ValueError.
+    """
+    import pandas as pd
+
+    for values in columns.values():
+        values.setflags(write=False)
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+class DMStore:
+    """Memory-mapped view over every DM table."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "index.json")) as f:
+            self.index = json.load(f)
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported DM store version in {store_dir}")
+        self.partitions = self.index["partitions"]
+        self.aliases = self.index["aliases"]
+        # A trailing NaN lets code -1 decode to a missing label
+        self.vocab = {
+            column: np.array(values + [np.nan], dtype=object)
+            for column, values in self.index["vocab"].items()
+        }
+        for values in self.vocab.values():
+            values.setflags(write=False)
+        self._lookup = {}
+        self._no_rows = np.array([], dtype=np.int64)
+        self._no_rows.setflags(write=False)
+        self.codes = {}
+        self.measures = {}
+        for category in CATEGORIES:
+            files = self.index["arrays"][category]
+            self.codes[category] = np.load(os.path.join(store_dir, files["codes"]), mmap_mode="r")
+            self.measures[category] = np.load(os.path.join(store_dir, files["measures"]), mmap_mode="r")
+
+    def resolve(self, category, state, unit_type):
+        """Return the partition key of a table, or None if there is none."""
+        key = partition_key(category, state, unit_type)
+        if key not in self.partitions and state.upper() in STATE_ALIASES:
+            key = partition_key(category, STATE_ALIASES[state.upper()], unit_type)
+        return key if key in self.partitions else None
+
+    def has(self, category, state, unit_type):
+        return self.resolve(category, state, unit_type) is not None
+
+    def rows(self, category, state, unit_type):
+        """Return the (start, stop) row range of one table."""
+        key = self.resolve(category, state, unit_type)
+        if key is None:
+            raise KeyError(f"No {category} data for {state} ({unit_type})")
+        return self.partitions[key]
+
+    def count(self, category, state, unit_type):
+        """Return the number of rows of one table (0 if there is none)."""
+        key = self.resolve(category, state, unit_type)
+        if key is None:
+            return 0
+        start, stop = self.partitions[key]
+        return stop - start
+
+    def table(self, category, state, unit_type):
+        """Return one table as a DataFrame with the original CSV columns."""
+        start, stop = self.rows(category, state, unit_type)
+        return self._frame(category, np.arange(start, stop), start)
+
+    def frame(self, category):
+        """Return every table of a category as one DataFrame.
+
+        Besides the CSV columns it carries state, unit_type and the parsed
+        Structure columns, ready for vectorized joins across tables.
+        """
+        import pandas as pd
+
+        ranges = []
+        states = []
+        unit_types = []
+        for key, (start, stop) in self.partitions.items():
+            key_category, state, unit_type = key.split("/")
+            if key_category == category:
+                # Aliased partitions repeat their owner's rows under their own name
+                ranges.append(np.arange(start, stop))
+                states += [state] * (stop - start)
+                unit_types += [unit_type] * (stop - start)
+        rows = np.concatenate(ranges)
+        data = {"state": np.array(states, dtype=object), "unit_type": np.array(unit_types, dtype=object)}
+        codes = self.codes[category][rows]
+        for position, column in enumerate(CODE_COLUMNS):
+            data[column] = self.vocab[column][codes[:, position]]
+        measures = self.measures[category][rows]
+        for position, column in enumerate(MEASURES[category]):
+            data[column] = measures[:, position]
+        return read_only_frame(data)
+
+    def lookup(self, category, state, unit_type, structure_type, tenure, bedrooms, value=None):
+        """Return the row offsets of one selection.
+
+        `value` is a VALUE_TENURE such as "First Tercile"; None selects every
+        value band of the structure.
+        """
+        key = self.resolve(category, state, unit_type)
+        if key is None:
+            return self._no_rows
+        groups = self._groups(key)
+        return groups.get((structure_type, tenure, bedrooms, value), self._no_rows)
+
+    def build_index(self):
+        """Index every table now instead of on first lookup."""
+        for key in self.partitions:
+            self._groups(key)
+
+    def _groups(self, key):
+        # Indexed per table on first use, so opening the store stays cheap;
+        # aliases share their owner's index
+        key = self.aliases.get(key, key)
+        groups = self._lookup.get(key)
+        if groups is None:
+            groups = self._lookup[key] = self._index_partition(key.split("/")[0], *self.partitions[key])
+        return groups
+
+    def select(self, category, state, unit_type, structure_type, tenure, bedrooms, value=None):
+        """Return the rows of one selection with the original CSV columns."""
+        start, _ = self.rows(category, state, unit_type)
+        rows = self.lookup(category, state, unit_type, structure_type, tenure, bedrooms, value)
+        return self._frame(category, rows, start)
+
+    def records(self, category, rows, columns):
+        """Return rows as tuples of plain Python values, without pandas."""
+        codes = self.codes[category][rows]
+        measures = self.measures[category][rows]
+        values = []
+        for column in columns:
+            if column in CODE_COLUMNS:
+                values.append(self.vocab[column][codes[:, CODE_COLUMNS.index(column)]].tolist())
+            else:
+                # Shortest float32 repr, so 2.7565422 is not printed as 2.756542205810547
+                column = measures[:, MEASURES[category].index(column)].astype(str)
+                values.append([float(text) for text in column])
+        return [
+            tuple(None if value != value else value for value in row)
+            for row in zip(*values)
+        ]
+
+    def _index_partition(self, category, start, stop):
+        codes = np.asarray(self.codes[category][start:stop])
+        labels = zip(*(
+            self.vocab[column][codes[:, CODE_COLUMNS.index(column)]]
+            for column in PARSED_COLUMNS + ["VALUE_TENURE"]
+        ))
+        groups = {}
+        for row, (structure_type, tenure, bedrooms, value) in enumerate(labels, start):
+            groups.setdefault((structure_type, tenure, bedrooms, None), []).append(row)
+            groups.setdefault((structure_type, tenure, bedrooms, value), []).append(row)
+        groups = {key: np.array(rows, dtype=np.int64) for key, rows in groups.items()}
+        for rows in groups.values():
+            rows.setflags(write=False)
+        return groups
+
+    def _frame(self, category, rows, start):
+        codes = self.codes[category][rows]
+        data = {
+            column: self.vocab[column][codes[:, CODE_COLUMNS.index(column)]]
+            for column in LABEL_COLUMNS
+        }
+        measures = self.measures[category][rows]
+        for position, column in enumerate(MEASURES[category]):
+            data[column] = measures[:, position]
+        # Keep the row labels the table had in its CSV file
+        return read_only_frame(data, index=rows - start)
+
+
+def open_store(store_dir=STORE_DIR, data_dir=DATA_DIR):
+    """Open the store, building it from the CSVs if missing or outdated."""
+    try:
+        return DMStore(store_dir)
+    except (FileNotFoundError, ValueError):
+        from demographics.ingest import build_store
+
+        build_store(data_dir, store_dir)
+    return DMStore(store_dir)
@@ -0,0 +1,132 @@
+"""Consistency checks over the DM store, written next to it by ingest.
+
+    python -m demographics validate
+
+The report lists:
+
+    duplicates          groups of byte-identical csvs; a group is suspicious
+                        unless its state names are spellings of one place
+                        (WASHINGTON D.C. and WASHINGTON.DC.)
+    missing_tables      (category, state, unit) combinations without a csv
+    missing_statistics  tables exported without the Low/High columns
+    unbracketed_rows    rows whose Low/High do not bracket the estimate
+"""
+import json
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from demographics.store import CATEGORIES, MEASURES, STORE_DIR, UNIT_TYPES, DMStore
+
+REPORT_NAME = "validation.json"
+# float32 rounding of Low/High written with fewer digits than the estimate
+TOLERANCE = 1e-4
+MAX_EXAMPLES = 5
+
+
+def _place(state):
+    return re.sub(r"[^A-Z]", "", state.upper())
+
+
+def find_duplicates(sources):
+    by_checksum = defaultdict(list)
+    for name, source in sorted(sources.items()):
+        by_checksum[source["sha256"]].append((name, source["partition"]))
+    duplicates = []
+    for checksum, members in by_checksum.items():
+        if len(members) < 2:
+            continue
+        states = sorted({partition.split("/")[1] for _, partition in members})
+        duplicates.append({
+            "sha256": checksum,
+            "files": [name for name, _ in members],
+            "states": states,
+            "suspicious": len({_place(state) for state in states}) > 1,
+        })
+    return duplicates
+
+
+def find_missing_tables(partitions):
+    states = sorted({key.split("/")[1] for key in partitions})
+    return [
+        {"category": category, "state": state, "unit_type": unit_type}
+        for state in states
+        for category in CATEGORIES
+        for unit_type in UNIT_TYPES
+        if f"{category}/{state}/{unit_type}" not in partitions
+    ]
+
+
+def check_brackets(store, category, key):
+    """Return (has_statistics, unbracketed row count, examples) for one table."""
+    start, stop = store.partitions[key]
+    columns = MEASURES[category]
+    measures = np.asarray(store.measures[category][start:stop])
+    estimate = measures[:, 0]
+    low = measures[:, columns.index("Low")]
+    high = measures[:, columns.index("High")]
+    known = ~np.isnan(estimate) & ~np.isnan(low) & ~np.isnan(high)
+    bad = known & ((low > estimate + TOLERANCE) | (high < estimate - TOLERANCE))
+    rows = np.flatnonzero(bad)
+    structure, value = (
+        store.vocab[column][store.codes[category][start:stop][rows, position]]
+        for column, position in (("Structure", 0), ("VALUE_TENURE", 1))
+    )
+    examples = [
+        {
+            "row": int(row),
+            "Structure": structure[i],
+            "VALUE_TENURE": value[i],
+            columns[0]: float(estimate[row]),
+            "Low": float(low[row]),
+            "High": float(high[row]),
+        }
+        for i, row in enumerate(rows[:MAX_EXAMPLES])
+    ]
+    return bool((~np.isnan(low)).any()), int(len(rows)), examples
+
+
+def validate_store(store):
+    """Return the validation report of an open DMStore as a dict."""
+    missing_statistics = []
+    unbracketed = []
+    for key in store.partitions:
+        # Aliases share their owner's rows, so they are checked once
+        if key in store.aliases:
+            continue
+        category = key.split("/")[0]
+        has_statistics, count, examples = check_brackets(store, category, key)
+        if not has_statistics:
+            missing_statistics.append(key)
+        if count:
+            unbracketed.append({"partition": key, "rows": count, "examples": examples})
+    duplicates = find_duplicates(store.index["sources"])
+    return {
+        "tables": len(store.partitions),
+        "unique_tables": len(store.partitions) - len(store.aliases),
+        "suspicious_duplicates": sum(group["suspicious"] for group in duplicates),
+        "duplicates": duplicates,
+        "missing_tables": find_missing_tables(store.partitions),
+        "missing_statistics": missing_statistics,
+        "unbracketed_rows": unbracketed,
+    }
+
+
+def write_report(store_dir=STORE_DIR):
+    """Validate the store in `store_dir` and write REPORT_NAME next to it."""
+    report = validate_store(DMStore(store_dir))
+    with open(os.path.join(store_dir, REPORT_NAME), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def summary(report):
+    return (
+        f"{report['unique_tables']} unique of {report['tables']} tables; "
+        f"{report['suspicious_duplicates']} suspicious duplicate groups, "
+        f"{len(report['missing_tables'])} missing tables, "
+        f"{len(report['missing_statistics'])} without statistics, "
+        f"{sum(entry['rows'] for entry in report['unbracketed_rows'])} unbracketed rows"
+    )
@@ -1,9 +1,20 @@
 # Import required libraries
 import streamlit as st
 import pandas as pd
-import pydeck as pdk
-import json
-import re
+import io
+import uuid
+from demographics.compare import compare_states
+from demographics.data_access import load_geometry, select_rows
+from demographics.export import FORMAT_LABELS, export_zip
+from demographics.instrumentation import Trace
+from demographics.maps import choropleth_deck, state_deck
+from demographics.prefetch import Prefetcher
+from demographics.regions import PRESETS, preset_name, select_rollup
+from demographics.selection import (
+    CATEGORY_LABELS, COMBINED_OPTIONS, HOUSING_VALUES, LABELS_SELECTED, STATE_NAMES, STRUCTURE_TENURE_MAP,
+    UNIT_TYPES, bedroom_options, bedroom_size,
+)
+from demographics.sites import enrich_sites
 # Set up custom CSS styling for the Streamlit app (title and instructions)
 st.markdown(
     """
@@ -31,36 +42,39 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# Opt-in timing of each phase of this rerun (DM_TRACE=1); add ?debug=1 to the
+# URL to see the spans in the sidebar
+trace = Trace("rerun", session=st.session_state.setdefault("trace_session", uuid.uuid4().hex[:12]))
+
 # Title and Instructions container
 with st.container():
     st.markdown('<div class="title">Explore US Housing and Demographics Data</div>', unsafe_allow_html=True)
 
-# Data: U.S. states with their centroids (latitude and longitude)
+# Data: U.S. states offered in the app. Centroids (latitude and longitude)
+# are derived from the state boundaries rather than maintained by hand.
+with trace.span("geometry"):
+    geometry = load_geometry()
+state_names = STATE_NAMES
+# The "Select a state" entry centres the map on the continental U.S.
+us_center = (38.526600, -96.726486)
+# Household-weighted rollups follow the states: the nation, the census
+# regions and divisions, and a custom group of states picked in the sidebar
+custom_region = "Custom Region"
+rollup_names = list(PRESETS) + [custom_region]
+rollup_centers = [
+    us_center if len(PRESETS.get(name, state_names)) > 20 else
+    tuple(sum(geometry.centroid(state)[axis] for state in PRESETS[name]) / len(PRESETS[name]) for axis in (0, 1))
+    for name in rollup_names
+]
 state_data = {
-    'State': ['Select a state','Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado', 'Connecticut', 'Delaware', 'Florida', 'Georgia',
-              'Hawaii', 'Idaho', 'Illinois', 'Indiana', 'Iowa', 'Kansas', 'Kentucky', 'Louisiana', 'Maine', 'Maryland',
-              'Massachusetts', 'Michigan', 'Minnesota', 'Mississippi', 'Missouri', 'Montana', 'Nebraska', 'Nevada', 'New Hampshire', 'New Jersey',
-              'New Mexico', 'New York', 'North Carolina', 'North Dakota', 'Ohio', 'Oklahoma', 'Oregon', 'Pennsylvania', 'Puerto Rico', 'Rhode Island', 'South Carolina', 'South Dakota',
-              'Tennessee', 'Texas', 'Utah', 'Vermont', 'Virginia', 'Washington', 'Washington D.C.', 'West Virginia', 'Wisconsin', 'Wyoming'],
-    'Latitude': [38.526600,32.806671, 61.370716, 33.729759, 34.969704, 36.116203, 39.059811, 41.597782, 39.318523, 27.766279, 33.040619,
-                 21.094318, 44.240459, 40.349457, 39.849426, 42.011539, 38.526600, 37.668140, 31.169546, 44.693947, 39.063946,
-                 42.230171, 43.326618, 45.694454, 32.741646, 38.456085, 46.921925, 41.125370, 38.313515, 43.452492, 40.298904,
-                 34.840515, 42.165726, 35.630066, 47.528912, 40.388783, 35.565342, 44.572021, 40.590752, 38.89511, 41.680893, 33.856892, 44.299782,
-                 35.747845, 31.054487, 40.150032, 44.045876, 37.769337, 47.400902, 38.9072, 38.491226, 44.268543, 42.755966],
-    'Longitude': [ -96.726486,-86.791130, -152.404419, -111.431221, -92.373123, -119.681564, -105.311104, -72.755371, -75.507141, -81.686783, -83.643074,
-                  -157.498337, -114.478828, -88.986137, -86.258278, -93.210526, -96.726486, -84.670067, -91.867805, -69.381927, -76.802101,
-                  -71.530106, -84.536095, -93.900192, -89.678696, -92.288368, -110.454353, -98.268082, -117.055374, -71.563896, -74.521011,
-                  -106.248482, -74.948051, -79.806419, -99.784012, -82.764915, -96.928917, -122.070938, -77.209755, -77.03637, -71.511780, -80.945007, -99.438828,
-                  -86.692345, -97.563461, -111.862434, -72.710686, -78.169968, -121.490494, -77.0369, -80.954456, -89.616508, -107.302490]
+    'State': ['Select a state'] + state_names + rollup_names,
+    'Latitude': [us_center[0]] + [geometry.centroid(name)[0] for name in state_names] + [center[0] for center in rollup_centers],
+    'Longitude': [us_center[1]] + [geometry.centroid(name)[1] for name in state_names] + [center[1] for center in rollup_centers]
 }
 
 # Create a DataFrame from the state data
 df_states = pd.DataFrame(state_data)
 
-# Load state boundaries from a GeoJSON file
-with open("gz_2010_us_040_00_5m.json") as f:
-    geojson_data = json.load(f)
-
 # Definitions for selection also the demographic categories
 definitions = {
     "Persons by Age": "Demographic data on the distribution of persons by age categories.",
@@ -75,67 +89,33 @@ definitions = {
 # User selects state, unit type, and data category
 st.sidebar.title("1. Housing Location")
 selected_state = st.sidebar.selectbox("State:", df_states['State']).upper()
-# unit_types = ["Allunits", "Newerunits"]
-unit_types = {
-    "All (All Age) Housing - Built in any year": "Allunits",
-    "Newer (Newer Built) Housing - Built 2000-2021": "Newerunits"
-}
-category_labels = {
-    "Household Size": "pop",
-    "Household Size Statistics": "pop",
-    "Persons by Age": "pop",
-    "Total School Age Children" : "sac",
-    "School Age Children by school level and grade group": "sac",
-    "School Age Children Statistics": "sac",
-    "Total Public School Children" : "psc",
-    "Public School Children by school level and grade group": "psc",
-    "Public School Children Statistics": "psc"
-}
+# A rollup's member states: a preset's, or the ones picked for a custom region
+if selected_state == custom_region.upper():
+    rollup_states = st.sidebar.multiselect("States in the region:", state_names)
+    if not rollup_states:
+        st.sidebar.info("Pick the states of the region.")
+        selected_state = "SELECT A STATE"
+else:
+    rollup_states = PRESETS.get(preset_name(selected_state) or "")
+# Housing age and demographic category choices come from demographics.selection
+unit_types = UNIT_TYPES
+category_labels = CATEGORY_LABELS
 st.sidebar.title("2. Housing Type")
 # selected_unit_type = st.sidebar.selectbox("Housing Age:", unit_types, help="Newer Housing: Built between 2000-2021.\nAll Housing: Built in any year.")
 selected_label = st.sidebar.selectbox("(i) Housing Age:", list(unit_types.keys()))
 selected_unit_type = unit_types[selected_label]
  
 # Combined structure and tenure options
-combined_options = [
-    "Single-Family Detached (Combines Own and Rent tenure)",
-    "Single-Family Attached (Combines Own and Rent tenure)",
-    "Smaller (2-4 unit) Multifamily (Combines Own and Rent tenure)",
-    "Midsize (5-49 units) Multifamily (Own tenure alone)",
-    "Midsize (5-49 units) Multifamily (Rent tenure alone)",
-    "Larger (50 or more units) Multifamily (Own tenure alone)",
-    "Larger (50 or more units) Multifamily (Rent tenure alone)",
-    "All Housing (all above housing types) (Own tenure alone)",
-    "All Housing (all above housing types) (Rent tenure alone)"
-]
+combined_options = COMBINED_OPTIONS
 
 # Sidebar selectbox to choose structure and tenure and avialable bedrooms
 selected_combined_option = st.sidebar.selectbox("(ii) Structure and Tenure:", combined_options)
 
-if selected_combined_option == "Single-Family Detached (Combines Own and Rent tenure)":
-    br_size_options = ['3 BR', '4-5 BR', '2 BR']
-elif selected_combined_option == "Single-Family Attached (Combines Own and Rent tenure)":
-    br_size_options = ['3 BR', '2 BR']
-elif selected_combined_option in [
-    "Smaller (2-4 unit) Multifamily (Combines Own and Rent tenure)", 
-    "Midsize (5-49 units) Multifamily (Own tenure alone)", 
-    "Midsize (5-49 units) Multifamily (Rent tenure alone)", 
-    "Larger (50 or more units) Multifamily (Own tenure alone)", 
-    "Larger (50 or more units) Multifamily (Rent tenure alone)"
-]:
-    br_size_options = ['3 BR', '2 BR', '0-1 BR']
-elif selected_combined_option in [
-    "All Housing (all above housing types) (Own tenure alone)", 
-    "All Housing (all above housing types) (Rent tenure alone)"
-]:
-    br_size_options = ['3 BR', '4-5 BR', '2 BR', '0-1 BR']
+# Bedroom sizes published for the selected structure type
+br_size_options = bedroom_options(selected_combined_option)
 
-selected_size = st.sidebar.selectbox("(iii) Housing Size (Number of Bedrooms):", ['Studio-1BR' if x == '0-1 BR' else x for x in sorted(br_size_options)])
-housing_value = []
-if (selected_unit_type=='Allunits'):
-    housing_value=['All Values', 'First Tercile', 'Second Tercile', 'Third Tercile ']
-else:
-    housing_value=['All Values', '    Below Median', '    Above Median']
+selected_size = st.sidebar.selectbox("(iii) Housing Size (Number of Bedrooms):", br_size_options)
+housing_value = HOUSING_VALUES[selected_unit_type]
 
 #Select Hosuing values all_housing_value_options = ["All Available"] + housing_value
 selected_value = st.sidebar.selectbox("(iv) Housing Value in dollars $", housing_value)
@@ -143,25 +123,15 @@ selected_value = st.sidebar.selectbox("(iv) Housing Value in dollars $", housing
 st.sidebar.title ("3. Demographic Data Category")  
 selected_category_label = st.sidebar.selectbox("", category_labels.keys())
 selected_category = category_labels[selected_category_label]
-if (selected_unit_type=='Allunits'):
-    selected_unit_type='ALLunits'
-else:
-    selected_unit_type='NEWERunits'
+national_map = st.sidebar.checkbox(
+    "Color the map by this category for all states",
+    help="National map of the selected housing type and category.",
+)
+compare_all_states = st.sidebar.checkbox(
+    "Compare all states",
+    help="Show the selected housing type and category for every state, ranked.",
+)
 try:
-    file_name = f"DM_{selected_category}_{selected_state}_{selected_unit_type}.csv"
-    
-    if selected_state != "SELECT A STATE":
-        data = pd.read_csv(file_name)
-    # Get unique values from the "Structure" column
-    # unique_structures = data["Structure"].unique()
-    #####
-    # Split into components
-        def normalize_structure(structure):
-            structure = re.sub(r"\s*\(\s*", " (", structure)
-            structure = re.sub(r"\s*\)\s*,?\s*", ") ", structure)
-            return structure.strip()  
-        unique_structures = data["Structure"].apply(normalize_structure).unique()
-
     # structure_options = []
     # tenure_options = set()
     # size_options = set()
@@ -193,17 +163,7 @@ try:
     
 
     # Mapping selected option back to structure and tenure
-    structure_tenure_map = {
-        "Single-Family Detached (Combines Own and Rent tenure)": ("Single-Family Detached", "Own/Rent"),
-        "Single-Family Attached (Combines Own and Rent tenure)": ("Single-Family Attached", "Own/Rent"),
-        "Smaller (2-4 unit) Multifamily (Combines Own and Rent tenure)": ("2-4 Units", "Own/Rent"),
-        "Midsize (5-49 units) Multifamily (Own tenure alone)": ("5-49 Units", "Own"),
-        "Midsize (5-49 units) Multifamily (Rent tenure alone)": ("5-49 Units", "Rent"),
-        "Larger (50 or more units) Multifamily (Own tenure alone)": ("50+ Units", "Own"),
-        "Larger (50 or more units) Multifamily (Rent tenure alone)": ("50+ Units", "Rent"),
-        "All Housing (all above housing types) (Own tenure alone)": ("All Housing Types", "Own"),
-        "All Housing (all above housing types) (Rent tenure alone)": ("All Housing Types", "Rent"),
-    }
+    structure_tenure_map = STRUCTURE_TENURE_MAP
 
     # Get the selected structure and tenure
     selected_type, selected_tenure = structure_tenure_map[selected_combined_option]
@@ -219,120 +179,164 @@ try:
     # else:
     #     tenure_options_display = ["Own/Rent"]
     # selected_tenure = st.sidebar.selectbox("Tenure:", tenure_options_display)
-    if (selected_size == 'Studio-1BR'):
-        selected_size = '0-1 BR'
-    # Reconstruct the structure format
-    selected_structure = f"{selected_type} ({selected_tenure}) {selected_size}"
-    
+    selected_size = bedroom_size(selected_size)
+
     if selected_state != "SELECT A STATE":
-        data["Normalized_Structure"] = data["Structure"].apply(normalize_structure)
+        # Structure type, tenure and size are parsed at ingest, so the selection
+        # is a single index lookup ("All Values" keeps every value band)
+        with trace.span("filter") as span:
+            if rollup_states:
+                # Weighted by Number of Households across the member states
+                filtered_data = select_rollup(
+                    selected_state, selected_category, selected_unit_type,
+                    selected_type, selected_tenure, selected_size,
+                    None if selected_value == "All Values" else selected_value,
+                    states=rollup_states,
+                )
+            else:
+                filtered_data = select_rows(
+                    selected_category, selected_state, selected_unit_type,
+                    selected_type, selected_tenure, selected_size,
+                    None if selected_value == "All Values" else selected_value,
+                )
+            span["rows"] = len(filtered_data)
 
-        filtered_data = data[data["Normalized_Structure"] == selected_structure].copy()
-        data.drop(columns=["Normalized_Structure"], inplace=True)
-        filtered_data.drop(columns=["Normalized_Structure"], inplace=True)
+    # Load this state's other categories and housing ages in the background,
+    # so flipping between them is served from the cache
+    prefetcher = st.session_state.setdefault("prefetcher", Prefetcher())
+    if selected_state != "SELECT A STATE" and not rollup_states:
+        prefetcher.prefetch_selection(
+            selected_state, selected_category, selected_unit_type,
+            selected_type, selected_tenure, selected_size,
+            None if selected_value == "All Values" else selected_value,
+        )
+    else:
+        prefetcher.cancel()
+
+    # Bulk download of every table in the chosen scope, as one ZIP archive.
+    # Archives are built once per scope and format and shared by all sessions.
+    st.sidebar.title("4. Download Data")
+    export_scope = st.sidebar.radio(
+        "Tables:", ["Selected state, all categories", "Selected category, all states", "Everything"]
+    )
+    export_format = st.sidebar.radio("File format:", list(FORMAT_LABELS), horizontal=True)
+    if st.sidebar.checkbox("Prepare the download"):
+        export_state = selected_state if export_scope.startswith("Selected state") else None
+        export_category = selected_category_label if export_scope.startswith("Selected category") else None
+        if export_scope.startswith("Selected state") and (selected_state == "SELECT A STATE" or rollup_states):
+            st.sidebar.info("Select a state to download its tables.")
+        else:
+            with trace.span("export") as span:
+                archive = export_zip(export_state, export_category, fmt=FORMAT_LABELS[export_format])
+                span["bytes"] = len(archive)
+            st.sidebar.download_button(
+                "Download ZIP", archive,
+                file_name=f"DM_{export_state or export_category or 'all'}_{FORMAT_LABELS[export_format]}.zip",
+                mime="application/zip",
+            )
+    # Project sites given as coordinates: each one is located in its state and
+    # gets the multipliers of its own housing columns, or of the selection above
+    st.sidebar.title("5. Project Sites")
+    sites_file = st.sidebar.file_uploader(
+        "Sites (csv with latitude and longitude):", type="csv",
+        help="Optional unit_type, structure_type, tenure, bedrooms and value columns override the selection per site.",
+    )
     #####
     # User selects a structure to view details
     #selected_structure = st.sidebar.selectbox("Structure:", unique_structures)
 
     # Filter data based on the selected structure
     # filtered_data = data[data["Structure"] == selected_structure]
-    list_columns=["Structure", "VALUE_TENURE", "value_range"]
-    statistics= ["Number of Households" , "Standard Errors", "Low", "High", "Error Margin as %"]
-    labels_selected = {
-    "Household Size": ["Structure", "VALUE_TENURE", "value_range", "PERSONS"],
-    "Household Size Statistics" : ["Structure", "VALUE_TENURE", "value_range","Number of Households" , "Standard Errors", "Low", "High", "Error Margin as %"],
-    "Persons by Age": ["Structure", "VALUE_TENURE", "value_range", "0-4","5-17","18-34", "35-44", "45-54", "55-64", "65-74", "75+"],
-    "Total School Age Children" : ["Structure", "VALUE_TENURE", "value_range", "SAC"],
-    "School Age Children by school level and grade group": ["Structure", "VALUE_TENURE", "value_range", "(K-5)", "(6-8)", "(9-12)"],
-    "School Age Children Statistics":["Structure", "VALUE_TENURE", "value_range", "Standard Errors", "Low", "High", "Error Margin as %"],
-    "Total Public School Children" : ["Structure", "VALUE_TENURE", "value_range", "PSC"],
-    "Public School Children by school level and grade group": ["Structure", "VALUE_TENURE", "value_range", "(K-5)", "(6-8)", "(9-12)"],
-    "Public School Children Statistics": ["Structure", "VALUE_TENURE", "value_range", "Standard Errors", "Low", "High", "Error Margin as %"],
-    }
+    labels_selected = LABELS_SELECTED
     map_placeholder = st.empty()
     table_placeholder = st.empty()
+    compare_placeholder = st.empty()
+    sites_placeholder = st.empty()
 
     if selected_state != "SELECT A STATE":
-        if selected_value != "All Values":
-            filtered_data = filtered_data[filtered_data['VALUE_TENURE'] == selected_value]
         # Display the filtered data
-        with table_placeholder.container():
+        with table_placeholder.container(), trace.span("table") as span:
             if not filtered_data.empty:
                 # st.dataframe(filtered_data)
-                st.dataframe(filtered_data[labels_selected[selected_category_label]])
+                shown = filtered_data[labels_selected[selected_category_label]]
+                if rollup_states:
+                    # States counts the member states with data for each row
+                    shown = filtered_data[labels_selected[selected_category_label] + ["States"]]
+                    st.caption(
+                        f"Weighted by Number of Households across {len(rollup_states)} states. "
+                        "Value ranges differ between states and are left out."
+                    )
+                st.dataframe(shown)
+                span["rows"] = len(shown)
+                if trace.enabled:
+                    span["bytes"] = int(shown.memory_usage(deep=True).sum())
             else:
                 st.write("No data available for the selected structure.")
 
         selected_state= selected_state.title()
-    # Get coordinates for the selected state
-    
-    state_row = df_states[df_states['State'] == selected_state]
-    
-    if not state_row.empty:
-        coordinates = state_row[['Latitude', 'Longitude']].values[0]
 
-        # Filter the GeoJSON data to include only the selected state
-        selected_state_feature = next(
-            (feature for feature in geojson_data["features"] if feature["properties"]["NAME"]== selected_state), None
-        )
-        filtered_geojson_data = {
-            "type": "FeatureCollection",
-            "features": [selected_state_feature] if selected_state_feature else []
-        }
+    if compare_all_states:
+        # Every state's matching row in one pass over the all-states table
+        with compare_placeholder.container(), trace.span("compare") as span:
+            st.markdown(f"**{selected_category_label} across all states**")
+            ranked = compare_states(
+                selected_unit_type, selected_combined_option, selected_size,
+                selected_value, selected_category_label, states=state_names,
+            )
+            st.dataframe(ranked, hide_index=True)
+            span["rows"] = len(ranked)
 
-        # Create a DataFrame for the map
-        state_data_for_map = pd.DataFrame({
-            'latitude': [coordinates[0]],
-            'longitude': [coordinates[1]],
-            'state': [selected_state]
-        })
-    with map_placeholder.container():
-        if selected_state == "SELECT A STATE":
-            coordinates = df_states.iloc[0,[1,2]]
-            
-            st.pydeck_chart(pdk.Deck(
-                map_style="mapbox://styles/mapbox/light-v9",
-                initial_view_state=pdk.ViewState(
-                    latitude=coordinates[0],
-                    longitude=coordinates[1],
-                    zoom=3,
-                    pitch=0,
+    if sites_file is not None:
+        with sites_placeholder.container(), trace.span("sites") as span:
+            site_defaults = {
+                "unit_type": selected_unit_type, "structure_type": selected_type, "tenure": selected_tenure,
+                "bedrooms": selected_size, "value": selected_value,
+            }
+            # Located and joined once per upload and selection, not on every rerun
+            sites_key = (sites_file.file_id,) + tuple(site_defaults.values())
+            if st.session_state.get("sites_key") != sites_key:
+                st.session_state["sites"] = None
+                st.session_state["sites_key"] = sites_key
+                try:
+                    sites = enrich_sites(pd.read_csv(io.BytesIO(sites_file.getvalue())), site_defaults)
+                    st.session_state["sites"] = sites
+                    st.session_state["sites_csv"] = sites.to_csv(index=False).encode()
+                except (KeyError, ValueError) as error:
+                    st.session_state["sites_error"] = error.args[0]
+            sites = st.session_state["sites"]
+            if sites is None:
+                # A bad upload shows what is wrong with it instead of stopping the app
+                st.error(f"Could not read the sites file: {st.session_state['sites_error']}")
+            else:
+                st.markdown(f"**Project sites:** {sites['state'].notna().sum()} of {len(sites)} located in a state")
+                # Large uploads are previewed; the download has every site
+                st.dataframe(sites.head(1000), hide_index=True)
+                st.download_button(
+                    "Download sites with multipliers", st.session_state["sites_csv"],
+                    file_name="sites_multipliers.csv", mime="text/csv",
                 )
-            ))        
+                span["rows"] = len(sites)
+    # Get coordinates for the selected state
+    state_row = df_states[df_states['State'] == selected_state]
+    with map_placeholder.container(), trace.span("map") as span:
+        if national_map:
+            # Values are prejoined onto simplified boundaries and the deck is
+            # serialized once per selection
+            deck = choropleth_deck(
+                selected_unit_type, selected_combined_option, selected_size,
+                selected_value, selected_category_label, states=state_names,
+            )
+        elif state_row.empty:
+            deck = state_deck()
         else:
-            # Define the map
-            coordinates = df_states.iloc[0,[1,2]]
-            
-            st.pydeck_chart(pdk.Deck(
-                map_style="mapbox://styles/mapbox/light-v9",
-                initial_view_state=pdk.ViewState(
-                    latitude=coordinates[0],
-                    longitude=coordinates[1],
-                    zoom=3,
-                    pitch=0,
-                ),
-                layers=[
-                    # Scatterplot for the selected state
-                    pdk.Layer(
-                        'ScatterplotLayer',
-                        state_data_for_map,
-                        get_position='[longitude, latitude]',
-                        pickable=True,
-                    ),
-                    # GeoJSON layer for the selected state boundary
-                    pdk.Layer(
-                        "GeoJsonLayer",
-                        filtered_geojson_data,
-                        pickable=True,
-                        stroked=True,
-                        filled=True,
-                        extruded=False,
-                        line_width_min_pixels=2,
-                        get_fill_color=[255, 0, 0, 80],  # Red fill with transparency
-                        get_line_color=[255, 0, 0, 255],  # Red boundary
-                    )
-                ],
-            ))
+            # Cached per state, so changing only the housing type, size, value
+            # or category sends the same map, which the browser keeps as is
+            coordinates = tuple(float(x) for x in state_row[['Latitude', 'Longitude']].values[0])
+            deck = state_deck(selected_state, coordinates, rollup_states)
+        st.pydeck_chart(deck)
+        if trace.enabled:
+            # Serializing the deck again costs as much as building it
+            span["bytes"] = len(deck.to_json())
         
     file_path = "DM Overview Quick Guide Glossary Latest.docx"
     with open(file_path, "rb") as file:
@@ -396,3 +400,9 @@ try:
 
 except Exception as e:
     st.error(f"An error occurred: {e}")
+
+rerun = trace.finish()
+if trace.enabled and st.experimental_get_query_params().get("debug") == ["1"]:
+    with st.sidebar.expander("Debug: rerun timings", expanded=True):
+        st.dataframe(pd.DataFrame(trace.spans), hide_index=True)
+        st.caption(f"Rerun {rerun['total_ms']:.1f} ms, session {trace.session}")
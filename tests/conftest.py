@@ -0,0 +1,41 @@
+"""Shared fixtures. The tests run against the repository's DM csvs and store."""
+import os
+import random
+
+import pytest
+
+from demographics.data_access import get_store
+from demographics.ingest import find_dm_files, parse_structure
+from demographics.store import DATA_DIR
+
+
+@pytest.fixture(scope="session")
+def store():
+    return get_store()
+
+
+@pytest.fixture(scope="session")
+def sqlite_url(tmp_path_factory):
+    from demographics.sql import load_sql
+
+    url = "sqlite:///" + os.path.join(tmp_path_factory.mktemp("sql"), "dm.sqlite")
+    load_sql(url)
+    return url
+
+
+@pytest.fixture(scope="session")
+def selections(store):
+    """Random (category, state, unit_type, structure_type, tenure, bedrooms, value) selections.
+
+    Each is drawn from a row of a random table; value is None (every band)
+    for about half of them.
+    """
+    rng = random.Random(0)
+    files = sorted(find_dm_files(DATA_DIR))
+    chosen = []
+    for _ in range(200):
+        category, state, unit_type = rng.choice(files)
+        row = rng.choice(store.table(category, state, unit_type).to_dict("records"))
+        value = rng.choice([row["VALUE_TENURE"], None])
+        chosen.append((category, state, unit_type) + tuple(parse_structure(row["Structure"])) + (value,))
+    return chosen
@@ -0,0 +1,17 @@
+from demographics.compare import compare_states
+from demographics.selection import STATE_NAMES
+
+DETACHED = "Single-Family Detached (Combines Own and Rent tenure)"
+
+
+def test_default_ranks_each_state_once():
+    ranked = compare_states("ALLunits", DETACHED, "3 BR")
+    assert sorted(ranked["State"]) == sorted(STATE_NAMES)
+    assert ranked["Rank"].iloc[0] == 1
+    assert ranked["PERSONS"].is_monotonic_decreasing
+
+
+def test_states_limit_the_comparison():
+    ranked = compare_states("NEWERunits", DETACHED, "3 BR", category_label="Total School Age Children",
+                            states=["Ohio", "Washington D.C.", "Texas"])
+    assert sorted(ranked["State"]) == ["Ohio", "Texas", "Washington D.C."]
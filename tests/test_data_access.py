@@ -0,0 +1,32 @@
+from demographics.data_access import LRUCache
+
+
+def test_lru_evicts_by_count():
+    cache = LRUCache(maxsize=2)
+    for key in "abc":
+        cache.get_or_load(key, lambda key=key: key)
+    cache.get_or_load("b", lambda: "reloaded")
+    assert cache.info()["size"] == 2
+    assert cache.get_or_load("a", lambda: "reloaded") == "reloaded"
+
+
+def test_lru_evicts_by_bytes():
+    cache = LRUCache(maxsize=100, maxbytes=10, sizeof=len)
+    cache.get_or_load("a", lambda: b"x" * 4)
+    cache.get_or_load("b", lambda: b"x" * 4)
+    cache.get_or_load("c", lambda: b"x" * 4)
+    assert cache.info()["size"] == 2
+    assert cache.info()["bytes"] == 8
+    # An entry larger than maxbytes is kept on its own
+    cache.get_or_load("d", lambda: b"x" * 20)
+    assert cache.info()["size"] == 1
+    assert cache.info()["bytes"] == 20
+
+
+def test_pinned_entries_are_not_evicted():
+    cache = LRUCache(maxsize=1)
+    cache.get_or_load(("store", 1), lambda: "store", slot="store")
+    for key in "abc":
+        cache.get_or_load(key, lambda key=key: key)
+    assert cache.get_or_load(("store", 1), lambda: "reloaded", slot="store") == "store"
+    assert cache.get_or_load(("store", 2), lambda: "rebuilt", slot="store") == "rebuilt"
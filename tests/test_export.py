@@ -0,0 +1,67 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from demographics.export import iter_zip
+from demographics.selection import CATEGORY_LABELS, LABELS_SELECTED
+
+
+def archive(**scope):
+    return zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(**scope))))
+
+
+def test_state_archive_has_every_table(store):
+    with archive(state="New Jersey") as zipped:
+        names = zipped.namelist()
+        assert len(names) == len(CATEGORY_LABELS) * 2
+        for label, category in CATEGORY_LABELS.items():
+            for unit_type in ("ALLunits", "NEWERunits"):
+                name = f"{label}/DM_{category}_NEW JERSEY_{unit_type}.csv"
+                data = pd.read_csv(zipped.open(name))
+                expected = store.table(category, "NEW JERSEY", unit_type)[LABELS_SELECTED[label]]
+                assert list(data.columns) == list(expected.columns)
+                measures = list(expected.select_dtypes("number").columns)
+                assert data["Structure"].tolist() == expected["Structure"].tolist()
+                np.testing.assert_allclose(
+                    data[measures].to_numpy(dtype=np.float64),
+                    expected[measures].to_numpy(dtype=np.float64),
+                    rtol=1e-6, equal_nan=True,
+                )
+
+
+def test_category_archive_covers_every_state(store):
+    with archive(category_label="Total Public School Children", unit_type="ALLunits") as zipped:
+        names = zipped.namelist()
+    expected = [key for key in store.partitions if key.startswith("psc/") and key.endswith("/ALLunits")]
+    assert len(names) == len(expected)
+
+
+@pytest.mark.parametrize("fmt, read", [("xlsx", pd.read_excel), ("parquet", pd.read_parquet)])
+def test_binary_formats(store, fmt, read):
+    with archive(state="Ohio", category_label="Household Size", unit_type="ALLunits", fmt=fmt) as zipped:
+        (name,) = zipped.namelist()
+        assert name == f"Household Size/DM_pop_OHIO_ALLunits.{fmt}"
+        data = read(io.BytesIO(zipped.read(name)))
+    expected = store.table("pop", "OHIO", "ALLunits")[LABELS_SELECTED["Household Size"]]
+    np.testing.assert_allclose(data["PERSONS"], expected["PERSONS"], rtol=1e-6)
+
+
+def test_bad_scope():
+    with pytest.raises(KeyError):
+        next(iter_zip(state="Atlantis"))
+    with pytest.raises(KeyError):
+        next(iter_zip(fmt="pdf"))
+
+
+def test_archives_survive_a_full_shared_cache():
+    from demographics.data_access import CACHE_SIZE, memoize
+    from demographics.export import _archives, export_zip
+
+    archive = export_zip("Ohio", "Household Size", "ALLunits")
+    for number in range(CACHE_SIZE + 1):
+        memoize(("filler", number), lambda: number)
+    assert export_zip("Ohio", "Household Size", "ALLunits") is archive
+    assert _archives.info()["bytes"] >= len(archive)
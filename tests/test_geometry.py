@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pytest
+
+from demographics.data_access import load_geojson, load_geometry
+from demographics.geometry import StateGeometry, StateLocator, _polygons
+
+
+@pytest.fixture(scope="module")
+def features():
+    return load_geojson()["features"]
+
+
+@pytest.fixture(scope="module")
+def locator(features):
+    return StateLocator(features)
+
+
+def brute_force(features, latitudes, longitudes):
+    """Even-odd test of every point against every edge of every state."""
+    result = np.full(len(latitudes), -1)
+    y = latitudes[:, None]
+    x = longitudes[:, None]
+    for number, feature in enumerate(features):
+        inside = np.zeros(len(latitudes), dtype=bool)
+        for polygon in _polygons(feature["geometry"]):
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)
+                x0, y0, x1, y1 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    crosses = ((y0 > y) != (y1 > y)) & (x < x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+                inside ^= crosses.sum(axis=1) % 2 == 1
+        result[inside & (result < 0)] = number
+    return result
+
+
+def test_locator_matches_brute_force(features, locator):
+    rng = np.random.default_rng(0)
+    # Points in random states' bounding boxes, including Alaska's islands
+    # east of the antimeridian
+    bounds = np.array(locator.bounds)[rng.integers(len(locator.bounds), size=3000)]
+    longitudes = rng.uniform(bounds[:, 0], bounds[:, 2])
+    latitudes = rng.uniform(bounds[:, 1], bounds[:, 3])
+    longitudes[:200] = rng.uniform(172, 180, 200)
+    latitudes[:200] = rng.uniform(51, 54, 200)
+    located = locator.locate(latitudes, longitudes)
+    np.testing.assert_array_equal(located, brute_force(features, latitudes, longitudes))
+    assert (located >= 0).sum() > 1000
+
+
+def test_known_points(locator):
+    latitudes = [40.7357, 38.8977, 21.3069, 61.2181, 30.0, np.nan]
+    longitudes = [-74.1724, -77.0365, -157.8583, -149.9003, -60.0, -74.0]
+    names = [locator.names[i] if i >= 0 else None for i in locator.locate(latitudes, longitudes)]
+    assert names == ["New Jersey", "District of Columbia", "Hawaii", "Alaska", None, None]
+
+
+def test_centroids_are_in_their_states(locator):
+    geometry = load_geometry()
+    names = list(geometry.centroids)
+    points = np.array([geometry.centroids[name] for name in names])
+    located = locator.locate(points[:, 0], points[:, 1])
+    assert [locator.names[i] for i in located] == names
+
+
+def test_saved_geometry_matches_a_fresh_build():
+    geojson = load_geojson()
+    built = StateGeometry(geojson)
+    saved = StateGeometry(geojson, derived=json.loads(json.dumps(built.derived())))
+    assert saved.centroids == built.centroids
+    for zoom in built.simplified:
+        assert saved.feature("Texas", zoom) == built.feature("Texas", zoom)
+
+
+def test_simplified_boundaries_are_smaller(features):
+    geometry = load_geometry()
+    full = len(json.dumps(geometry.feature("Alaska")))
+    sizes = [len(json.dumps(geometry.feature("Alaska", zoom))) for zoom in sorted(geometry.simplified)]
+    assert sizes == sorted(sizes)
+    assert sizes[-1] < full
+
+
+def test_app_state_names_resolve():
+    geometry = load_geometry()
+    assert geometry.resolve("NEW JERSEY") == "New Jersey"
+    assert geometry.resolve("Washington D.C.") == "District of Columbia"
+    assert geometry.resolve("Atlantis") is None
+    assert geometry.feature("Atlantis") is None
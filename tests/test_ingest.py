@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from demographics.ingest import build_store, find_dm_files, normalize_labels, read_dm_csv
+from demographics.store import DATA_DIR, LABEL_COLUMNS, MEASURES, DMStore
+
+SUBSET = [
+    "DM_pop_NEW JERSEY_ALLunits.csv",
+    "DM_sac_NEW JERSEY_ALLunits.csv",
+    "DM_psc_NEW JERSEY_ALLunits.csv",
+    "DM_pop_ARKANSAS_ALLunits.csv",
+    # A byte-identical copy of the Arkansas table
+    "DM_pop_KANSAS_ALLunits.csv",
+]
+
+
+def assert_table_matches_csv(table, path, category):
+    expected = normalize_labels(read_dm_csv(path, category))
+    assert list(table.columns) == LABEL_COLUMNS + MEASURES[category]
+    for column in LABEL_COLUMNS:
+        assert table[column].fillna("").tolist() == expected[column].fillna("").tolist(), column
+    # Measures are stored as float32
+    np.testing.assert_allclose(
+        table[MEASURES[category]].to_numpy(dtype=np.float64),
+        expected[MEASURES[category]].to_numpy(dtype=np.float64),
+        rtol=1e-6, equal_nan=True,
+    )
+
+
+def test_every_table_round_trips(store):
+    files = find_dm_files(DATA_DIR)
+    assert len(files) == 324
+    for (category, state, unit_type), name in files.items():
+        table = store.table(category, state, unit_type)
+        assert_table_matches_csv(table, os.path.join(DATA_DIR, name), category)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for name in SUBSET:
+        shutil.copy(os.path.join(DATA_DIR, name), directory / name)
+    return directory
+
+
+def test_identical_csvs_are_stored_once(data_dir, tmp_path):
+    index = build_store(str(data_dir), str(tmp_path / "store"))
+    assert index["build"] == {"parsed": 4, "reused": 0}
+    assert index["aliases"] == {"pop/KANSAS/ALLunits": "pop/ARKANSAS/ALLunits"}
+    store = DMStore(str(tmp_path / "store"))
+    pd.testing.assert_frame_equal(
+        store.table("pop", "KANSAS", "ALLunits"), store.table("pop", "ARKANSAS", "ALLunits")
+    )
+
+
+def test_incremental_rebuild(data_dir, tmp_path):
+    store_dir = str(tmp_path / "store")
+    build_store(str(data_dir), store_dir)
+    assert build_store(str(data_dir), store_dir)["build"] == {"parsed": 0, "reused": 4}
+
+    # Change one estimate of one table
+    changed = data_dir / "DM_pop_NEW JERSEY_ALLunits.csv"
+    raw = pd.read_csv(changed, dtype=str, keep_default_na=False)
+    raw.loc[0, "PERSONS"] = "9.5"
+    raw.to_csv(changed, index=False)
+    index = build_store(str(data_dir), store_dir)
+    assert index["build"] == {"parsed": 1, "reused": 3}
+    store = DMStore(store_dir)
+    assert store.table("pop", "NEW JERSEY", "ALLunits")["PERSONS"].iloc[0] == np.float32(9.5)
+    assert_table_matches_csv(store.table("pop", "NEW JERSEY", "ALLunits"), changed, "pop")
+    assert_table_matches_csv(
+        store.table("sac", "NEW JERSEY", "ALLunits"), data_dir / "DM_sac_NEW JERSEY_ALLunits.csv", "sac"
+    )
+
+    # A removed csv drops its table; its identical copy takes over the rows
+    os.remove(data_dir / "DM_pop_ARKANSAS_ALLunits.csv")
+    index = build_store(str(data_dir), store_dir)
+    assert index["build"] == {"parsed": 0, "reused": 4}
+    assert index["aliases"] == {}
+    store = DMStore(store_dir)
+    assert not store.has("pop", "ARKANSAS", "ALLunits")
+    assert_table_matches_csv(
+        store.table("pop", "KANSAS", "ALLunits"), data_dir / "DM_pop_KANSAS_ALLunits.csv", "pop"
+    )
+
+    assert build_store(str(data_dir), store_dir, full=True)["build"] == {"parsed": 4, "reused": 0}
+
+
+def test_rebuild_keeps_the_previous_index_readable(data_dir, tmp_path):
+    store_dir = tmp_path / "store"
+    build_store(str(data_dir), str(store_dir))
+    first = (store_dir / "index.json").read_text()
+    build_store(str(data_dir), str(store_dir), full=True)
+    second = (store_dir / "index.json").read_text()
+
+    # A reader that read the first index before the rebuild gets its own rows
+    (store_dir / "index.json").write_text(first)
+    expected = DMStore(str(store_dir)).table("pop", "NEW JERSEY", "ALLunits")
+    (store_dir / "index.json").write_text(second)
+    pd.testing.assert_frame_equal(DMStore(str(store_dir)).table("pop", "NEW JERSEY", "ALLunits"), expected)
+
+    # The first build's arrays go with the next build
+    build_store(str(data_dir), str(store_dir), full=True)
+    arrays = sorted(path.name for path in store_dir.glob("*.npy"))
+    assert len(arrays) == 12
+    assert not set(arrays) & {name for files in json.loads(first)["arrays"].values() for name in files.values()}
@@ -0,0 +1,35 @@
+import threading
+
+from demographics.instrumentation import PHASE_METRICS, Trace, write_metrics_file
+
+
+def test_concurrent_metrics_file_writes(tmp_path):
+    path = tmp_path / "dm.prom"
+    trace = Trace("rerun", enabled=True)
+    with trace.span("filter") as span:
+        span["rows"] = 3
+    trace.finish()
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                write_metrics_file(str(path))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert path.read_text() == PHASE_METRICS.prometheus_text()
+    assert [entry.name for entry in tmp_path.iterdir()] == ["dm.prom"]
+
+
+def test_disabled_spans_record_nothing():
+    trace = Trace("rerun", enabled=False)
+    with trace.span("filter") as span:
+        span["rows"] = 1
+    assert trace.finish()["spans"] == []
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from demographics import data_access
+from demographics.prefetch import Prefetcher
+
+SELECTION = ("pop", "ALLunits", "Single-Family Detached", "Own/Rent", "3 BR", None)
+
+
+@pytest.fixture
+def prefetcher():
+    data_access.clear_cache()
+    executor = ThreadPoolExecutor(1)
+    yield Prefetcher(executor)
+    executor.shutdown(wait=True)
+    data_access.clear_cache()
+
+
+def wait(prefetcher):
+    for future in prefetcher._futures:
+        future.result()
+
+
+def test_prefetch_keeps_out_of_the_shared_cache(prefetcher):
+    shared = data_access.cache_info()["size"]
+    prefetcher.prefetch_selection("New Jersey", *SELECTION)
+    wait(prefetcher)
+    # The selection on each of the five sibling tables
+    assert data_access.prefetch_cache_info()["size"] == 5
+    assert data_access.cache_info()["size"] == shared
+
+    # Opening a prefetched selection moves it into the shared cache
+    rows = data_access.select_rows("sac", "New Jersey", "NEWERunits", *SELECTION[2:])
+    assert len(rows)
+    assert data_access.prefetch_cache_info()["size"] == 4
+    assert data_access.cache_info()["size"] == shared + 1
+
+
+def test_prefetch_indexes_the_sibling_tables(prefetcher):
+    store = data_access.get_store()
+    prefetcher.prefetch_selection("Ohio", *SELECTION)
+    wait(prefetcher)
+    assert {"sac/OHIO/ALLunits", "psc/OHIO/NEWERunits"} <= set(store._lookup)
+    assert "pop/OHIO/ALLunits" not in store._lookup
+
+
+def test_only_a_new_state_prefetches(prefetcher):
+    prefetcher.prefetch_selection("New Jersey", *SELECTION)
+    wait(prefetcher)
+    futures = prefetcher._futures
+    prefetcher.prefetch_selection("New Jersey", "sac", "NEWERunits", "50+ Units", "Rent", "2 BR", None)
+    assert prefetcher._futures is futures
+    prefetcher.prefetch_selection("Ohio", *SELECTION)
+    assert prefetcher._futures is not futures
+    wait(prefetcher)
+    assert data_access.prefetch_cache_info()["size"] == 10
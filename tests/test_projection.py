@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from demographics.data_access import load_frame
+from demographics.projection import KEY_COLUMNS, Z_90, project
+from demographics.simulation import simulate
+
+STATES = ["NEW JERSEY", "TEXAS", "OHIO"]
+# Low and High are published rounded to three decimals
+ROUNDING = 0.002
+
+
+@pytest.fixture(scope="module")
+def rows():
+    """PERSONS rows with a standard error well below the estimate."""
+    frame = load_frame("pop")
+    rows = frame[
+        frame["state"].isin(STATES)
+        & (frame["VALUE_TENURE"] == "All Values")
+        & (frame["Standard Errors"] > 0)
+        & (frame["PERSONS"] > 6 * frame["Standard Errors"])
+    ]
+    return rows.sample(12, random_state=0).reset_index(drop=True)
+
+
+def programs(rows, units):
+    lines = rows[KEY_COLUMNS[:-1]].copy()
+    lines["value"] = rows["VALUE_TENURE"]
+    lines["state"] = lines["state"].str.title()
+    lines["units"] = units
+    lines["project"] = [f"p{number}" for number in range(len(rows))]
+    return lines
+
+
+def test_single_lines_reproduce_the_table(rows):
+    units = np.arange(1, len(rows) + 1) * 10
+    totals = project(programs(rows, units))
+    np.testing.assert_allclose(totals["PERSONS"], rows["PERSONS"] * units, rtol=1e-6)
+    np.testing.assert_allclose(totals["PERSONS Low"], rows["Low"] * units, atol=ROUNDING * units.max())
+    np.testing.assert_allclose(totals["PERSONS High"], rows["High"] * units, atol=ROUNDING * units.max())
+    assert (totals["Unmatched Units"] == 0).all()
+
+
+def test_lines_of_a_project_add_up(rows):
+    lines = programs(rows.iloc[:2], [100, 50])
+    lines["project"] = "Elm St"
+    totals = project(lines).loc["Elm St"]
+    estimates = rows["PERSONS"].iloc[:2].to_numpy(dtype=np.float64)
+    errors = rows["Standard Errors"].iloc[:2].to_numpy(dtype=np.float64)
+    assert totals["PERSONS"] == pytest.approx(100 * estimates[0] + 50 * estimates[1], rel=1e-6)
+    error = np.hypot(100 * errors[0], 50 * errors[1])
+    assert totals["PERSONS High"] - totals["PERSONS"] == pytest.approx(Z_90 * error, rel=1e-6)
+
+
+def test_unmatched_lines_are_counted(rows):
+    lines = programs(rows.iloc[:1], [10])
+    lines.loc[0, "bedrooms"] = "9 BR"
+    totals = project(lines)
+    assert totals["Unmatched Units"].iloc[0] == 10
+    assert pd.isna(totals["PERSONS"].iloc[0])
+
+
+def test_app_labels_match_the_table_labels(rows):
+    lines = programs(rows, 10)
+    expected = project(lines)
+    # Unit types in any case, bedroom counts and sidebar sizes, padded values
+    lines["unit_type"] = lines["unit_type"].str.lower()
+    lines["bedrooms"] = lines["bedrooms"].map({"0-1 BR": "Studio-1BR", "2 BR": 2, "3 BR": "3", "4-5 BR": 4})
+    lines["value"] = lines["value"] + " "
+    lines["state"] = " " + lines["state"]
+    pd.testing.assert_frame_equal(project(lines), expected)
+
+
+def test_simulated_intervals_match_the_table(rows):
+    intervals = simulate(programs(rows, 1), draws=200_000, seed=1)
+    persons = intervals.xs("PERSONS", level="total")
+    errors = rows["Standard Errors"].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(persons["Mean"], rows["PERSONS"], atol=0.01 * errors.max())
+    np.testing.assert_allclose(persons["P5"], rows["Low"], atol=ROUNDING + 0.02 * errors.max())
+    np.testing.assert_allclose(persons["P95"], rows["High"], atol=ROUNDING + 0.02 * errors.max())
+
+
+def test_simulation_is_reproducible(rows):
+    lines = programs(rows.iloc[:3], [100, 20, 5])
+    pd.testing.assert_frame_equal(simulate(lines, draws=5000, seed=3), simulate(lines, draws=5000, seed=3))
+
+
+def test_simulated_projects_match_project():
+    frame = load_frame("pop")
+    rows = frame[
+        (frame["VALUE_TENURE"] == "All Values")
+        & (frame["Standard Errors"] > 0)
+        & (frame["PERSONS"] > 6 * frame["Standard Errors"])
+    ].sample(40, random_state=1).reset_index(drop=True)
+    lines = programs(rows, np.arange(1, len(rows) + 1))
+    # Projects of 20, 3, 1 and 16 lines: more than SMALL_PROJECT pairs and fewer
+    lines["project"] = ["a"] * 20 + ["b"] * 3 + ["c"] + ["d"] * 16
+    expected = project(lines)
+    intervals = simulate(lines, draws=50_000, seed=2)
+    for name in ["PERSONS", "SAC", "PSC"]:
+        simulated = intervals.xs(name, level="total").loc[expected.index]
+        error = (expected[f"{name} High"] - expected[name]) / Z_90
+        np.testing.assert_allclose(simulated["Mean"], expected[name], atol=0.02 * error.max())
+        np.testing.assert_allclose(simulated["P5"], expected[f"{name} Low"], atol=0.05 * error.max())
+        np.testing.assert_allclose(simulated["P95"], expected[f"{name} High"], atol=0.05 * error.max())
+    for name in intervals.index.unique("total"):
+        simulated = intervals.xs(name, level="total").loc[expected.index, "Mean"]
+        np.testing.assert_allclose(simulated, expected[name], rtol=0.01, atol=1e-3)
+
+
+def test_simulated_unmatched_lines_are_counted(rows):
+    lines = programs(rows.iloc[:3], [10, 20, 30])
+    lines.loc[1, "bedrooms"] = "9 BR"
+    lines.loc[2, "project"] = "p0"
+    intervals = simulate(lines, draws=1000)
+    expected = project(lines)
+    unmatched = intervals.groupby(level="project", sort=False)["Unmatched Units"].first()
+    pd.testing.assert_series_equal(unmatched, expected["Unmatched Units"], check_names=False)
+    assert intervals.loc["p1"].drop(columns="Unmatched Units").isna().all().all()
+    assert intervals.loc["p0"].notna().all().all()
@@ -0,0 +1,62 @@
+import http.client
+import json
+import socket
+
+import pytest
+
+from demographics.service import serve_in_thread
+
+STRUCTURE = "Single-Family Detached (Combines Own and Rent tenure)"
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = serve_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, body, length):
+    """POST over a raw socket; returns the response and whether the server then hung up."""
+    with socket.create_connection(("127.0.0.1", server.server_port), timeout=10) as sock:
+        sock.sendall(f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n".encode() + body)
+        response = http.client.HTTPResponse(sock)
+        response.begin()
+        payload = json.loads(response.read())
+        sock.settimeout(0.5)
+        try:
+            closed = sock.recv(1) == b""
+        except TimeoutError:
+            closed = False
+    return response, payload, closed
+
+
+def test_bulk_queries_answer_each_query(server):
+    body = json.dumps({"queries": [{"state": "Texas", "structure": STRUCTURE, "size": "3 BR"}, {"state": "Atlantis"}]}).encode()
+    response, payload, closed = post(server, "/multipliers", body, len(body))
+    assert response.status == 200
+    first, second = payload["results"]
+    assert first["rows"]
+    assert "error" in second
+    assert not closed
+
+
+@pytest.mark.parametrize("path, length, status", [
+    ("/multipliers", "abc", 400),
+    ("/multipliers", "-1", 400),
+    ("/elsewhere", "2", 404),
+])
+def test_unread_bodies_close_the_connection(server, path, length, status):
+    response, payload, closed = post(server, path, b"{}", length)
+    assert response.status == status
+    assert "error" in payload
+    assert response.getheader("Connection") == "close"
+    assert closed
+
+
+def test_bad_json_keeps_the_connection(server):
+    response, payload, closed = post(server, "/multipliers", b"{}", 2)
+    assert response.status == 400
+    assert "error" in payload
+    assert not closed
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from demographics.data_access import load_frame
+from demographics.sites import enrich_sites
+
+# Newark, NJ and Austin, TX
+SITES = pd.DataFrame({"site": ["Elm St", "Oak Ave"], "latitude": [40.7357, 30.2672], "longitude": [-74.1724, -97.7431]})
+DEFAULTS = {"unit_type": "ALLunits", "structure_type": "Single-Family Detached", "tenure": "Own/Rent"}
+
+
+def table_persons(state, bedrooms):
+    frame = load_frame("pop")
+    row = frame[
+        (frame["state"] == state)
+        & (frame["unit_type"] == "ALLunits")
+        & (frame["structure_type"] == "Single-Family Detached")
+        & (frame["tenure"] == "Own/Rent")
+        & (frame["bedrooms"] == bedrooms)
+        & (frame["VALUE_TENURE"] == "All Values")
+    ]
+    return float(row["PERSONS"].iloc[0])
+
+
+def test_sites_get_their_state_and_row():
+    enriched = enrich_sites(SITES, dict(DEFAULTS, bedrooms="3 BR"))
+    assert list(enriched["state"]) == ["NEW JERSEY", "TEXAS"]
+    assert enriched["PERSONS"].iloc[0] == pytest.approx(table_persons("NEW JERSEY", "3 BR"))
+    assert enriched["PERSONS"].iloc[1] == pytest.approx(table_persons("TEXAS", "3 BR"))
+
+
+def test_bedroom_counts_match_the_table_labels():
+    sites = SITES.assign(bedrooms=[3, 4])
+    enriched = enrich_sites(sites, DEFAULTS)
+    assert list(enriched["bedrooms"]) == ["3 BR", "4-5 BR"]
+    assert enriched["PERSONS"].iloc[0] == pytest.approx(table_persons("NEW JERSEY", "3 BR"))
+    assert enriched["PERSONS"].iloc[1] == pytest.approx(table_persons("TEXAS", "4-5 BR"))
+
+
+def test_bad_coordinates_name_the_column_and_row():
+    sites = SITES.assign(longitude=["-74.1724", "west"])
+    with pytest.raises(ValueError, match="longitude .* row 1: 'west'"):
+        enrich_sites(sites, dict(DEFAULTS, bedrooms="3 BR"))
+
+
+def test_unit_types_match_in_any_case():
+    sites = SITES.assign(unit_type=["allunits", "All (All Age) Housing - Built in any year"])
+    defaults = {key: value for key, value in DEFAULTS.items() if key != "unit_type"}
+    enriched = enrich_sites(sites, dict(defaults, bedrooms="3 BR"))
+    assert list(enriched["unit_type"]) == ["ALLunits", "ALLunits"]
+    assert enriched["PERSONS"].iloc[0] == pytest.approx(table_persons("NEW JERSEY", "3 BR"))
+    assert enriched["PERSONS"].iloc[1] == pytest.approx(table_persons("TEXAS", "3 BR"))
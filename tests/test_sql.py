@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from demographics.sql import SQLSource
+
+
+@pytest.fixture(scope="module")
+def source(sqlite_url):
+    source = SQLSource(sqlite_url)
+    yield source
+    source.close()
+
+
+def assert_same_rows(actual, expected):
+    pd.testing.assert_frame_equal(
+        actual.astype({column: np.float64 for column in expected.select_dtypes("float32")}),
+        expected.astype({column: np.float64 for column in expected.select_dtypes("float32")}),
+        check_dtype=False, check_index_type=False, rtol=1e-6,
+    )
+
+
+def test_tables_match_store(source, store, selections):
+    for category, state, unit_type, *_ in selections[:50]:
+        assert source.count(category, state, unit_type) == store.count(category, state, unit_type)
+        assert_same_rows(source.table(category, state, unit_type), store.table(category, state, unit_type))
+
+
+def test_selections_match_store(source, store, selections):
+    for selection in selections:
+        assert_same_rows(source.select(*selection), store.select(*selection))
+
+
+def test_frame_matches_store(source, store):
+    for category in ("pop", "psc"):
+        assert_same_rows(source.frame(category), store.frame(category))
+
+
+def test_unknown_table(source):
+    with pytest.raises(KeyError):
+        source.table("pop", "ATLANTIS", "ALLunits")
+    with pytest.raises(KeyError):
+        source.select("pop", "ATLANTIS", "ALLunits", "2-4 Units", "Own/Rent", "2 BR")
+    assert not source.has("pop", "ATLANTIS", "ALLunits")
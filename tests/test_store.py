@@ -0,0 +1,26 @@
+import pandas as pd
+
+from demographics.ingest import parse_structure
+
+
+def scan(table, structure_type, tenure, bedrooms, value):
+    """The selection's rows found by parsing every Structure label of the table."""
+    parsed = table["Structure"].map(parse_structure)
+    keep = parsed.map(lambda labels: labels == (structure_type, tenure, bedrooms))
+    if value is not None:
+        keep &= table["VALUE_TENURE"] == value
+    return table[keep]
+
+
+def test_selections_match_a_scan(store, selections):
+    for category, state, unit_type, *labels in selections:
+        expected = scan(store.table(category, state, unit_type), *labels)
+        assert len(expected)
+        selected = store.select(category, state, unit_type, *labels)
+        pd.testing.assert_frame_equal(selected, expected, check_index_type=False)
+
+
+def test_unknown_selection_is_empty(store):
+    selected = store.select("pop", "OHIO", "ALLunits", "2-4 Units", "Own/Rent", "9 BR")
+    assert selected.empty
+    assert list(selected.columns) == list(store.table("pop", "OHIO", "ALLunits").columns)